@@ -1,12 +1,160 @@
 import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from email.utils import parsedate_to_datetime
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import get_metrics
+from response_cache import ResponseCache, cache_bypassed, get_cache
+
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_FACTOR = 0.5
+MAX_BACKOFF = 30
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+CONNECT_SECONDS = "weather_api_connect_seconds"
+
+_session = None
+_session_lock = threading.Lock()
+_request_stats = []
+_stats_lock = threading.Lock()
+
+class _TimedConnectMixin:
+    """Records how long a new connection takes to resolve and connect (DNS + TCP)"""
+
+    def _new_conn(self):
+        start = time.perf_counter()
+        try:
+            return super()._new_conn()
+        finally:
+            self._connect_seconds = time.perf_counter() - start
+            get_metrics().observe(CONNECT_SECONDS, self._connect_seconds, phase="connect")
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    """Also records the TLS handshake, i.e. the rest of connect() after _new_conn()"""
+
+    def connect(self):
+        start = time.perf_counter()
+        self._connect_seconds = 0.0
+        super().connect()
+        get_metrics().observe(CONNECT_SECONDS, time.perf_counter() - start - self._connect_seconds, phase="tls")
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools time connection setup; reused connections cost nothing"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool
+        }
 
-def get_current_weather(location: str):
+def get_session():
     """
-    Fetch current weather data for a given location.
-    API credentials and URL are stored in environment variables:
-    - API_URL
-    - API_KEY
+    Return the shared HTTP session.
+    The session keeps connections alive between calls so repeated requests
+    to the API host reuse the same TCP/TLS connection. The pool size follows
+    HTTP_POOL_SIZE (defaults to MAX_WORKERS) so concurrent fetches don't
+    have to open throwaway connections.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            pool_size = int(os.getenv("HTTP_POOL_SIZE") or os.getenv("MAX_WORKERS") or DEFAULT_MAX_WORKERS)
+            adapter = TimedHTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session = session
+    return _session
+
+def close_session():
+    """Close the shared HTTP session and its pooled connections"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+def get_request_stats():
+    """Return a copy of the stats recorded for every request made by this process"""
+    with _stats_lock:
+        return list(_request_stats)
+
+def reset_request_stats():
+    with _stats_lock:
+        _request_stats.clear()
+
+def _record(stats):
+    """Keep the stats of a finished lookup and count it in the metrics"""
+    with _stats_lock:
+        _request_stats.append(stats)
+    metrics = get_metrics()
+    outcome = "cached" if stats["cached"] else ("failure" if stats["error"] else "success")
+    metrics.inc("weather_api_requests_total", outcome=outcome)
+    if stats["retries"]:
+        metrics.inc("weather_api_retries_total", stats["retries"])
+    if not stats["cached"]:
+        metrics.observe("weather_api_request_seconds", stats["latency"])
+    metrics.event("api_request", outcome=outcome, **stats)
+
+def _retry_after_seconds(response):
+    """Parse a Retry-After header (either seconds or an HTTP date) into seconds"""
+    value = response.headers.get("Retry-After") if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+def _backoff_delay(attempt, response=None, backoff_factor=DEFAULT_BACKOFF_FACTOR):
+    """
+    Exponential backoff with full jitter, overridden by the server's
+    Retry-After, which is honoured in full. Returns None when Retry-After
+    is longer than MAX_BACKOFF: retrying sooner would only be throttled
+    again, so the caller gives up instead of stalling the run.
+    """
+    retry_after = _retry_after_seconds(response)
+    if retry_after is not None:
+        return retry_after if retry_after <= MAX_BACKOFF else None
+    return random.uniform(0, min(MAX_BACKOFF, backoff_factor * (2 ** attempt)))
+
+def fetch_current_weather(location: str, session=None, max_retries=None, timeout=DEFAULT_TIMEOUT, use_cache=True,
+                          limiter=None):
+    """
+    Fetch current weather data for a given location, retrying on 429/5xx
+    responses, timeouts and connection errors. Fresh responses are served
+    from the response cache unless use_cache is False or
+    WEATHER_CACHE_BYPASS is set. If a limiter (a rate_limit.TokenBucket)
+    is given, every attempt waits for a token first.
+
+    Returns a (data, stats) tuple. data is None when every attempt failed.
+    stats holds the location, final status code, total latency in seconds,
+    number of retries, whether the response came from the cache and the
+    last error (if any).
     """
     url = os.getenv("API_URL")
     api_key = os.getenv("RAPIDAPI_KEY")
@@ -14,20 +162,124 @@ def get_current_weather(location: str):
     if not url or not api_key:
         raise EnvironmentError("API_URL or API_KEY not set in environment variables.")
 
+    if max_retries is None:
+        max_retries = int(os.getenv("API_MAX_RETRIES") or DEFAULT_MAX_RETRIES)
+    session = session or get_session()
+
     headers = {
         "x-rapidapi-key": api_key,
         "x-rapidapi-host": "cities-temperature.p.rapidapi.com"
     }
     params = {"location": location}
 
-    try:
-        response = requests.get(url, headers=headers, params=params, timeout=10)
-        response.raise_for_status()  # Raise HTTPError for bad responses
-        return response.json()
-    except requests.exceptions.Timeout:
-        print("Request timed out.")
-    except requests.exceptions.HTTPError as http_err:
-        print(f"HTTP error occurred: {http_err}")
-    except requests.exceptions.RequestException as err:
-        print(f"Error occurred: {err}")
-    return None
+    stats = {"location": location, "status_code": None, "latency": 0.0, "retries": 0, "cached": False, "error": None}
+    data = None
+    start = time.perf_counter()
+
+    cache = get_cache() if use_cache and not cache_bypassed() else None
+    cache_key = ResponseCache.make_key(location, {"url": url, **params}) if cache else None
+    if cache is not None:
+        data = cache.get(cache_key)
+        if data is not None:
+            stats["cached"] = True
+            stats["latency"] = time.perf_counter() - start
+            _record(stats)
+            return data, stats
+
+    for attempt in range(max_retries + 1):
+        response = None
+        retryable = False
+        if limiter is not None:
+            limiter.acquire()
+        try:
+            response = session.get(url, headers=headers, params=params, timeout=timeout)
+            stats["status_code"] = response.status_code
+            response.raise_for_status()  # Raise HTTPError for bad responses
+            data = response.json()
+            if isinstance(data, dict):
+                # Remember when the reading was taken so cached replays keep their timestamp
+                data["fetched_at"] = time.time()
+            stats["error"] = None
+            break
+        except requests.exceptions.Timeout:
+            stats["error"] = "Request timed out."
+            retryable = True
+        except requests.exceptions.ConnectionError as err:
+            stats["error"] = f"Connection error occurred: {err}"
+            retryable = True
+        except requests.exceptions.HTTPError as http_err:
+            stats["error"] = f"HTTP error occurred: {http_err}"
+            retryable = response.status_code in RETRY_STATUS_CODES
+        except (requests.exceptions.RequestException, ValueError) as err:
+            stats["error"] = f"Error occurred: {err}"
+
+        if not retryable or attempt == max_retries:
+            print(f"{location}: {stats['error']}")
+            break
+
+        delay = _backoff_delay(attempt, response)
+        if delay is None:
+            print(f"{location}: {stats['error']} Retry-After exceeds {MAX_BACKOFF}s, giving up")
+            break
+        print(f"{location}: {stats['error']} Retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        stats["retries"] += 1
+        time.sleep(delay)
+
+    if data and cache is not None:
+        cache.set(cache_key, data)
+
+    stats["latency"] = time.perf_counter() - start
+    _record(stats)
+    return data, stats
+
+def get_current_weather(location: str, use_cache=True):
+    """
+    Fetch current weather data for a given location.
+    API credentials and URL are stored in environment variables:
+    - API_URL
+    - API_KEY
+    """
+    data, _ = fetch_current_weather(location, use_cache=use_cache)
+    return data
+
+def get_current_weather_many(locations, max_workers=None, use_cache=True, limiter=None):
+    """
+    Fetch current weather data for several locations concurrently.
+    The number of in-flight requests is capped by max_workers, which
+    defaults to the MAX_WORKERS environment variable (or 8), and their
+    rate by limiter, if given.
+
+    Returns a (results, failures) tuple:
+    - results: {location: weather data}
+    - failures: {location: error message}
+    """
+    if max_workers is None:
+        max_workers = int(os.getenv("MAX_WORKERS") or DEFAULT_MAX_WORKERS)
+
+    # Preserve order while dropping duplicate locations
+    locations = list(dict.fromkeys(locations))
+    results = {}
+    failures = {}
+    if not locations:
+        return results, failures
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(locations)))) as executor:
+        futures = {
+            executor.submit(fetch_current_weather, location, use_cache=use_cache, limiter=limiter): location
+            for location in locations
+        }
+        for future in as_completed(futures):
+            location = futures[future]
+            try:
+                data, stats = future.result()
+            except Exception as err:
+                failures[location] = str(err)
+                continue
+            if data:
+                results[location] = data
+            else:
+                failures[location] = stats["error"] or "No data returned"
+
+    if use_cache and not cache_bypassed():
+        get_cache().save()
+    return results, failures
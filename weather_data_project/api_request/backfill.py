@@ -0,0 +1,340 @@
+"""
+Backfill historical hourly readings for a list of cities.
+
+The live API only reports current weather, so history comes from the
+Open-Meteo archive (HISTORY_API_URL), with cities located through its
+geocoding API (see locations.py, shared with live ingestion so both use
+the same timezone). The date range is split into per-city
+chunks that run on a bounded worker pool behind a shared rate limit. Each
+chunk is written in committed batches and then checkpointed, so an
+interrupted backfill resumes with the chunks it had not finished.
+
+Hours that already have a reading for the city are skipped and inserts use
+the same (city, time) conflict check as ingestion, so a backfill can run
+alongside the hourly job.
+
+    python backfill.py --cities "Johannesburg,Cape Town" --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import requests
+
+from api_request import DEFAULT_MAX_RETRIES, DEFAULT_TIMEOUT, RETRY_STATUS_CODES, _backoff_delay, get_session
+from insert_data import (
+    RAW_TABLE, create_pool, create_table, get_cities, get_healthy_connection, insert_records_bulk
+)
+from locations import get_locations
+from metrics import get_metrics, record_run, span
+from notifications import ChangeSet, publish_changes
+from partitions import ensure_partitions
+from rate_limit import TokenBucket
+
+DEFAULT_HISTORY_URL = "https://archive-api.open-meteo.com/v1/archive"
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "backfill_checkpoint.json")
+DEFAULT_CHUNK_DAYS = 30
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 5.0
+DEFAULT_BATCH_SIZE = 5000
+
+# Units of the live feed's raw readings, as documented for raw_weather_data in
+# models/sources/sources.yml (tests/test_backfill.py keeps the two in step)
+DEFAULT_WIND_SPEED_UNIT = "mph"
+DEFAULT_TEMPERATURE_UNIT = "celsius"
+
+# WMO weather interpretation codes used by Open-Meteo, mapped onto the live
+# API's descriptions so backfilled and live readings share labels
+WEATHER_CODES = {
+    0: "Clear sky", 1: "Few clouds", 2: "Scattered clouds", 3: "Overcast clouds",
+    45: "Fog", 48: "Fog",
+    51: "Drizzle", 53: "Drizzle", 55: "Drizzle", 56: "Drizzle", 57: "Drizzle",
+    61: "Light rain", 63: "Moderate rain", 65: "Heavy rain",
+    66: "Light rain", 67: "Heavy rain",
+    71: "Snow", 73: "Snow", 75: "Snow", 77: "Snow",
+    80: "Light rain", 81: "Moderate rain", 82: "Heavy rain",
+    85: "Snow", 86: "Snow",
+    95: "Thunderstorm", 96: "Thunderstorm", 99: "Thunderstorm"
+}
+
+class Checkpoint:
+    """Completed chunk keys, kept in a JSON file that is rewritten atomically after each chunk"""
+
+    def __init__(self, path=DEFAULT_CHECKPOINT_PATH):
+        self.path = path
+        self._done = set()
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._done = set(json.load(f)["done"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Ignoring unreadable backfill checkpoint {path}: {e}")
+
+    def is_done(self, key):
+        with self._lock:
+            return key in self._done
+
+    def mark_done(self, key):
+        with self._lock:
+            self._done.add(key)
+            done = sorted(self._done)
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"done": done}, f)
+        os.replace(tmp_path, self.path)
+
+def plan_chunks(cities, start, end, chunk_days=DEFAULT_CHUNK_DAYS):
+    """(city, first day, last day) chunks covering start..end inclusive for every city"""
+    chunks = []
+    for city in cities:
+        chunk_start = start
+        while chunk_start <= end:
+            chunk_end = min(end, chunk_start + timedelta(days=chunk_days - 1))
+            chunks.append((city, chunk_start, chunk_end))
+            chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+def chunk_key(chunk):
+    city, start, end = chunk
+    return f"{city}|{start.isoformat()}|{end.isoformat()}"
+
+def _get_json(url, params, limiter, stop, max_retries=DEFAULT_MAX_RETRIES):
+    """GET url behind the shared rate limit, retrying on 429/5xx, timeouts and connection errors"""
+    session = get_session()
+    for attempt in range(max_retries + 1):
+        if not limiter.acquire(stop=stop):
+            raise InterruptedError("Backfill stopped")
+        response = None
+        try:
+            response = session.get(url, params=params, timeout=DEFAULT_TIMEOUT)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as err:
+            error = err
+        except requests.exceptions.HTTPError as err:
+            if response.status_code not in RETRY_STATUS_CODES:
+                raise
+            error = err
+        delay = _backoff_delay(attempt, response)
+        # A Retry-After beyond the cap fails the chunk; it stays pending for the next run
+        if attempt == max_retries or delay is None:
+            raise error
+        get_metrics().inc("weather_api_retries_total")
+        print(f"{url}: {error} Retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+        if stop.wait(delay):
+            raise InterruptedError("Backfill stopped")
+
+class HistorySource:
+    """Hourly history for a city from the Open-Meteo archive; locations come from the shared location cache"""
+
+    def __init__(self, limiter, stop):
+        self.limiter = limiter
+        self.stop = stop
+        self.history_url = os.getenv("HISTORY_API_URL") or DEFAULT_HISTORY_URL
+        self.wind_speed_unit = os.getenv("HISTORY_WIND_SPEED_UNIT") or DEFAULT_WIND_SPEED_UNIT
+        self.temperature_unit = os.getenv("HISTORY_TEMPERATURE_UNIT") or DEFAULT_TEMPERATURE_UNIT
+
+    def locate(self, city):
+        """(latitude, longitude, IANA timezone) of the best match for city"""
+        return get_locations().locate(
+            city, get_json=lambda url, params: _get_json(url, params, self.limiter, self.stop)
+        )
+
+    def readings(self, city, start, end):
+        """Readings shaped like the live API's (with time info added) for start..end inclusive (UTC days)"""
+        latitude, longitude, zone_name = self.locate(city)
+        zone = ZoneInfo(zone_name)
+        data = _get_json(self.history_url, {
+            "latitude": latitude,
+            "longitude": longitude,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "hourly": "temperature_2m,wind_speed_10m,weather_code",
+            # Pinned so a change in the archive's defaults can't skew backfilled rows
+            "wind_speed_unit": self.wind_speed_unit,
+            "temperature_unit": self.temperature_unit,
+            "timezone": "GMT"
+        }, self.limiter, self.stop)
+        hourly = data.get("hourly") or {}
+        readings = []
+        for at, temperature, wind_speed, code in zip(
+            hourly.get("time", []), hourly.get("temperature_2m", []),
+            hourly.get("wind_speed_10m", []), hourly.get("weather_code", [])
+        ):
+            # The archive lags a few days behind; hours without data come back as
+            # null and are left for run_chunk to report as missing
+            if temperature is None:
+                continue
+            local = datetime.fromisoformat(at).replace(tzinfo=timezone.utc).astimezone(zone)
+            readings.append({
+                "location": city,
+                "temperature": temperature,
+                "description": WEATHER_CODES.get(code, "Unknown"),
+                "wind_speed": wind_speed,
+                "timestamp": local.isoformat(),
+                "utc_offset": local.strftime("%z")
+            })
+        return readings
+
+def _day_start(day):
+    return datetime.combine(day, datetime.min.time(), timezone.utc)
+
+def expected_hours(start, end):
+    """UTC hours (as hours since the epoch) from start to end inclusive"""
+    return set(range(int(_day_start(start).timestamp()) // 3600,
+                     int(_day_start(end + timedelta(days=1)).timestamp()) // 3600))
+
+def existing_hours(conn, city, start, end):
+    """UTC hours (as hours since the epoch) between start and end inclusive that already have a reading"""
+    with conn.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT DISTINCT floor(extract(epoch FROM time) / 3600)::BIGINT
+            FROM {RAW_TABLE}
+            WHERE city = %s AND time >= %s AND time < %s
+            """,
+            (city, _day_start(start), _day_start(end + timedelta(days=1)))
+        )
+        hours = {row[0] for row in cursor.fetchall()}
+    conn.rollback()
+    return hours
+
+def _epoch_hour(reading):
+    return int(datetime.fromisoformat(reading["timestamp"]).timestamp() // 3600)
+
+def run_chunk(pool, source, chunk, batch_size):
+    """
+    Fetch one chunk and insert the hours that have no reading yet. Returns
+    (inserted, ChangeSet, missing), where missing are the UTC hours (since
+    the epoch) that neither the archive nor the table has a reading for.
+    """
+    city, start, end = chunk
+    with span("backfill_fetch", city=city, start=start, end=end):
+        readings = source.readings(city, start, end)
+    changes = ChangeSet()
+    conn = get_healthy_connection(pool)
+    try:
+        with span("backfill_insert", city=city, start=start, end=end):
+            stored = existing_hours(conn, city, start, end)
+            new = [reading for reading in readings if _epoch_hour(reading) not in stored]
+            inserted = insert_records_bulk(conn, new, chunk_size=batch_size, changes=changes) if new else 0
+    finally:
+        pool.putconn(conn)
+    missing = expected_hours(start, end) - stored - {_epoch_hour(reading) for reading in readings}
+    return inserted, changes, sorted(missing)
+
+def backfill(cities, start, end, chunk_days=DEFAULT_CHUNK_DAYS, workers=DEFAULT_WORKERS, rate=DEFAULT_RATE,
+             batch_size=DEFAULT_BATCH_SIZE, checkpoint_path=DEFAULT_CHECKPOINT_PATH):
+    """
+    Backfill start..end (inclusive UTC days) for cities. Chunks already in
+    the checkpoint are skipped; a chunk is only checkpointed once every hour
+    in it has a reading, so hours the archive didn't have yet are fetched
+    again on the next run. SIGTERM/SIGINT stop it after the chunks in
+    flight. Returns the number of rows inserted.
+    """
+    started = time.perf_counter()
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    checkpoint = Checkpoint(checkpoint_path)
+    chunks = plan_chunks(cities, start, end, chunk_days)
+    pending = [chunk for chunk in chunks if not checkpoint.is_done(chunk_key(chunk))]
+    print(f"Backfilling {len(cities)} cities from {start} to {end}: "
+          f"{len(pending)} of {len(chunks)} chunks to do, {workers} workers, {rate:g} requests/s")
+    if not pending:
+        return 0
+    retention = os.getenv("RETENTION_MONTHS")
+    if retention and start < date.today() - timedelta(days=31 * int(retention)):
+        print(f"Warning: RETENTION_MONTHS={retention}, so ingestion will drop partitions this backfill writes to")
+
+    source = HistorySource(TokenBucket(rate), stop)
+    pool = create_pool(maxconn=workers)
+    total, failed, incomplete = 0, 0, 0
+    changes = ChangeSet()
+    status = "failure"
+    try:
+        conn = get_healthy_connection(pool)
+        try:
+            create_table(conn)
+            ensure_partitions(conn, start, end, months_ahead=0)
+        finally:
+            pool.putconn(conn)
+
+        def run(chunk):
+            if stop.is_set():
+                return None
+            return run_chunk(pool, source, chunk, batch_size)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run, chunk): chunk for chunk in pending}
+            for done, future in enumerate(as_completed(futures), start=1):
+                chunk = futures[future]
+                try:
+                    result = future.result()
+                except InterruptedError:
+                    continue
+                except Exception as e:
+                    failed += 1
+                    print(f"Chunk {chunk_key(chunk)} failed: {e}")
+                    continue
+                if result is None:
+                    continue
+                inserted, chunk_changes, missing = result
+                total += inserted
+                changes.merge(chunk_changes)
+                if missing:
+                    incomplete += 1
+                    first = datetime.fromtimestamp(missing[0] * 3600, timezone.utc)
+                    print(f"[{done}/{len(pending)}] {chunk_key(chunk)}: {inserted} rows, "
+                          f"{len(missing)} hours not in the archive yet (from {first:%Y-%m-%d %H:00} UTC), left pending")
+                    continue
+                checkpoint.mark_done(chunk_key(chunk))
+                print(f"[{done}/{len(pending)}] {chunk_key(chunk)}: {inserted} rows")
+
+        if changes:
+            conn = get_healthy_connection(pool)
+            try:
+                publish_changes(conn, "backfill", [RAW_TABLE.split('.')[-1]], changes)
+            finally:
+                pool.putconn(conn)
+        status = "success" if not failed and not incomplete and not stop.is_set() else "partial"
+    finally:
+        pool.closeall()
+        record_run(status, time.perf_counter() - started)
+
+    remaining = len(pending) - sum(1 for chunk in pending if checkpoint.is_done(chunk_key(chunk)))
+    print(f"Backfill inserted {total} rows; {remaining} chunks left"
+          + (" (rerun the same command to resume)" if remaining else ""))
+    return total
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", help="comma separated list of cities (default: CITIES)")
+    parser.add_argument("--start", required=True, type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    parser.add_argument("--end", required=True, type=date.fromisoformat, help="last day, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--chunk-days", type=int, default=DEFAULT_CHUNK_DAYS, help="days fetched per request")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BACKFILL_WORKERS") or DEFAULT_WORKERS))
+    parser.add_argument("--rate", type=float, default=float(os.getenv("BACKFILL_RATE") or DEFAULT_RATE),
+                        help="maximum history API requests per second")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="rows per committed insert batch")
+    parser.add_argument("--checkpoint", default=os.getenv("BACKFILL_CHECKPOINT") or DEFAULT_CHECKPOINT_PATH,
+                        help="file recording finished chunks")
+    args = parser.parse_args()
+
+    if args.end < args.start:
+        parser.error("--end is before --start")
+    cities = [city.strip() for city in args.cities.split(",") if city.strip()] if args.cities else get_cities()
+    backfill(cities, args.start, args.end, args.chunk_days, max(1, args.workers), args.rate,
+             args.batch_size, args.checkpoint)
@@ -1,10 +1,53 @@
+import argparse
+import csv
+import io
+import re
+import signal
+import threading
+import time
 import psycopg2
-from api_request import get_current_weather
-from datetime import datetime, timezone
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from api_request import get_current_weather_many, get_request_stats, reset_request_stats
+from locations import DEFAULT_TIMEZONE, get_locations
+from metrics import get_metrics, record_run, serve_from_env, span
+from migrations import ensure_schema
+from notifications import ChangeSet, publish_changes
+from partitions import drop_old_partitions, ensure_partitions
+from scheduler import get_scheduler
+import spool
+from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 import os
 import pytz
 
+DEFAULT_CITIES = ['Johannesburg']
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_INTERVAL = 3600
+DEFAULT_POOL_SIZE = 2
+
+RAW_TABLE = 'dev.raw_weather_data'
+RAW_COLUMNS = (
+    'city',
+    'temperature',
+    'weather_description',
+    'wind_speed',
+    'time',
+    'utc_offset',
+    'ingest_key'
+)
+# First write wins: a reading for a city and time is never stored twice
+CONFLICT_TARGET = '(city, time)'
+CITY_INDEX = RAW_COLUMNS.index('city')
+TIME_INDEX = RAW_COLUMNS.index('time')
+
+def get_cities():
+    """Get the list of cities to ingest from the CITIES environment variable (comma separated)"""
+    cities = os.getenv("CITIES")
+    if not cities:
+        return list(DEFAULT_CITIES)
+    return [city.strip() for city in cities.split(",") if city.strip()]
+
 def get_db_connection_params():
     """Get database connection parameters from environment variables"""
     return {
@@ -16,21 +59,25 @@ def get_db_connection_params():
         'sslmode': os.getenv("POSTGRES_SSLMODE", "require")
     }
 
+def get_checked_connection_params():
+    """Get database connection parameters, raising if any required one is missing"""
+    conn_params = get_db_connection_params()
+    
+    # Print connection info (without password)
+    print(f"Connecting to: {conn_params['host']}:{conn_params['port']}")
+    print(f"Database: {conn_params['dbname']}")
+    print(f"User: {conn_params['user']}")
+    
+    # Check if required parameters are present
+    if not all([conn_params['host'], conn_params['user'], conn_params['dbname'], conn_params['password']]):
+        missing = [k for k, v in conn_params.items() if not v and k != 'sslmode']
+        raise ValueError(f"Missing required database parameters: {missing}")
+    return conn_params
+
 def connect_db():
     print("Connecting to database...")
     try:
-        conn_params = get_db_connection_params()
-        
-        # Print connection info (without password)
-        print(f"Connecting to: {conn_params['host']}:{conn_params['port']}")
-        print(f"Database: {conn_params['dbname']}")
-        print(f"User: {conn_params['user']}")
-        
-        # Check if required parameters are present
-        if not all([conn_params['host'], conn_params['user'], conn_params['dbname'], conn_params['password']]):
-            missing = [k for k, v in conn_params.items() if not v and k != 'sslmode']
-            raise ValueError(f"Missing required database parameters: {missing}")
-        
+        conn_params = get_checked_connection_params()
         conn = psycopg2.connect(**conn_params)
         print("Connection successful")
         return conn
@@ -41,33 +88,105 @@ def connect_db():
         print(f'Error getting connection parameters: {e}')
         raise
 
-def create_table(conn):
-    print('Creating table if not exists...')
+def create_pool(maxconn=None):
+    """Create a thread-safe connection pool for long-running ingestion"""
+    print("Creating database connection pool...")
+    maxconn = maxconn or int(os.getenv("DB_POOL_SIZE") or DEFAULT_POOL_SIZE)
     try:
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE SCHEMA IF NOT EXISTS dev;
-
-            CREATE TABLE IF NOT EXISTS dev.raw_weather_data (
-                id SERIAL PRIMARY KEY,
-                city TEXT,
-                temperature FLOAT,
-                weather_description TEXT,
-                wind_speed TEXT,
-                time TIMESTAMP,
-                time_inserted TIMESTAMP,
-                utc_offset TEXT
-            );
-            """
+        conn_params = get_checked_connection_params()
+        pool = ThreadedConnectionPool(
+            1, maxconn,
+            keepalives=1, keepalives_idle=60, keepalives_interval=10, keepalives_count=5,
+            **conn_params
         )
-        conn.commit()
-        print("Table created (or already exists).")
+        print(f"Connection pool ready (max {maxconn} connections)")
+        return pool
+    except psycopg2.Error as e:
+        print(f'Database connection failed: {e}')
+        raise
+
+def is_connection_healthy(conn):
+    """Check a pooled connection is still usable with a cheap round trip"""
+    if conn.closed:
+        return False
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+def get_healthy_connection(pool):
+    """Take a connection from the pool, replacing it if the server dropped it"""
+    conn = pool.getconn()
+    if is_connection_healthy(conn):
+        return conn
+    print("Pooled connection is broken, reconnecting...")
+    pool.putconn(conn, close=True)
+    return pool.getconn()
+
+def create_table(conn):
+    """Bring dev.raw_weather_data up to the latest schema version (see migrations.py)"""
+    print('Checking schema version...')
+    try:
+        ensure_schema(conn)
+        print("Schema is up to date.")
     except psycopg2.Error as e:
         print(f'Failed to create table: {e}')
         raise
 
-def insert_records(conn, data):
+def _to_float(value):
+    """Parse a number that may arrive as a string with units, e.g. "12.5 km/h" """
+    if value is None or isinstance(value, (int, float)):
+        return value
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value))
+    return float(match.group()) if match else None
+
+def _offset_seconds(utc_offset):
+    """Convert a "+0200" style offset to seconds"""
+    match = re.fullmatch(r"([+-])(\d{2}):?(\d{2})", utc_offset or "")
+    if not match:
+        return None
+    sign = -1 if match.group(1) == "-" else 1
+    return sign * (int(match.group(2)) * 3600 + int(match.group(3)) * 60)
+
+def normalize_reading(data):
+    """
+    Convert an API reading (with time info added) to typed values once, at
+    ingestion: numeric temperature and wind speed, a timezone-aware reading
+    time and the UTC offset in seconds.
+    """
+    timestamp = data["timestamp"]
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        utc_offset = int(timestamp.utcoffset().total_seconds())
+    else:
+        utc_offset = _offset_seconds(data.get("utc_offset"))
+        if utc_offset is None:
+            raise ValueError(f"Reading for {data['location']} has no UTC offset: {data['timestamp']}")
+        timestamp = timestamp.replace(tzinfo=timezone(timedelta(seconds=utc_offset)))
+    return {
+        "city": data["location"],
+        "temperature": _to_float(data["temperature"]),
+        "weather_description": data["description"],
+        "wind_speed": _to_float(data["wind_speed"]),
+        "time": timestamp,
+        "utc_offset": utc_offset,
+        "ingest_key": data.get("ingest_key") or spool.make_ingest_key(data)
+    }
+
+def reading_to_row(data):
+    """
+    Map an API reading (with time info added) to a typed raw_weather_data row.
+    time_inserted is left to the column default so it records when the row
+    actually landed, which is what incremental dbt runs key on.
+    """
+    reading = normalize_reading(data)
+    return tuple(reading[column] for column in RAW_COLUMNS)
+
+def insert_records(conn, data, table=RAW_TABLE):
     print('Inserting data...')
     if not data:
         print("No data to insert")
@@ -77,28 +196,25 @@ def insert_records(conn, data):
         cursor = conn.cursor()
         
         cursor.execute(
-            """ 
-            INSERT INTO dev.raw_weather_data(
+            f""" 
+            INSERT INTO {table}(
                 city,
                 temperature,
                 weather_description,
                 wind_speed,
                 time,
-                time_inserted,
-                utc_offset 
+                utc_offset,
+                ingest_key
             ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (
-                data["location"],
-                data["temperature"],
-                data["description"],
-                str(data["wind_speed"]),
-                data["timestamp"],
-                data["timestamp"],
-                data["utc_offset"]
-            )
+            ON CONFLICT {CONFLICT_TARGET} DO NOTHING
+            """, reading_to_row(data)
         )
+        inserted = cursor.rowcount
         conn.commit()
-        print(f"Data inserted successfully for {data['location']}")
+        if inserted:
+            print(f"Data inserted successfully for {data['location']}")
+        else:
+            print(f"Reading for {data['location']} at {data['timestamp']} already stored")
     except psycopg2.Error as e:
         print(f'Failed to insert data into the database: {e}')
         raise
@@ -107,39 +223,206 @@ def insert_records(conn, data):
         print(f'Available data keys: {list(data.keys()) if data else "No data"}')
         raise
 
-def add_time_info(data: dict, timezone_name="Africa/Johannesburg") -> dict:
+def _chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def _load_table_name(table):
+    return f"{table.split('.')[-1]}_load"
+
+def _copy_rows(cursor, rows, table):
+    """
+    Stream rows with COPY FROM STDIN (CSV, unquoted empty = NULL) into a
+    session-local load table, then move them into table with ON CONFLICT so
+    readings that are already stored are skipped. Returns rows inserted.
+    """
+    columns = ', '.join(RAW_COLUMNS)
+    load_table = _load_table_name(table)
+    cursor.execute(
+        f"""
+        CREATE TEMP TABLE IF NOT EXISTS {load_table} ON COMMIT DELETE ROWS AS
+        SELECT {columns} FROM {table} WITH NO DATA
+        """
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {load_table} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    cursor.execute(
+        f"""
+        INSERT INTO {table} ({columns})
+        SELECT {columns} FROM {load_table}
+        ON CONFLICT {CONFLICT_TARGET} DO NOTHING
+        """
+    )
+    return cursor.rowcount
+
+def _execute_values_rows(cursor, rows, table):
+    execute_values(
+        cursor,
+        f"INSERT INTO {table} ({', '.join(RAW_COLUMNS)}) VALUES %s ON CONFLICT {CONFLICT_TARGET} DO NOTHING",
+        rows,
+        page_size=len(rows)
+    )
+    return cursor.rowcount
+
+def insert_records_bulk(conn, readings, chunk_size=None, method='copy', table=RAW_TABLE, changes=None):
+    """
+    Insert an iterable of readings into dev.raw_weather_data in chunks.
+    Each chunk is loaded with COPY FROM STDIN and committed on its own, so a
+    failure only loses the chunk in flight. If COPY is not available (e.g.
+    behind a pooler that does not support it) the remaining chunks fall back
+    to execute_values. Pass method='values' to skip COPY entirely.
+    Readings already stored for the same city and time are skipped, so
+    replaying the same readings is safe.
+    If a ChangeSet is passed, the cities and times of every chunk that
+    inserted rows are added to it.
+
+    Returns the number of rows inserted.
+    """
+    if method not in ('copy', 'values'):
+        raise ValueError(f"Unknown bulk insert method: {method}")
+    chunk_size = chunk_size or int(os.getenv("INSERT_CHUNK_SIZE") or DEFAULT_CHUNK_SIZE)
+
+    total = 0
+    skipped = 0
+    cursor = conn.cursor()
+    try:
+        for chunk in _chunked(readings, chunk_size):
+            rows = []
+            for data in chunk:
+                try:
+                    rows.append(reading_to_row(data))
+                except (KeyError, ValueError, TypeError) as e:
+                    # Skip malformed readings so one bad spool line can't block the rest
+                    print(f'Skipping malformed reading ({e!r}): {data}')
+            if not rows:
+                continue
+            inserted = None
+            if method == 'copy':
+                try:
+                    inserted = _copy_rows(cursor, rows, table)
+                except (psycopg2.NotSupportedError, psycopg2.ProgrammingError) as e:
+                    conn.rollback()
+                    print(f'COPY failed ({e}), falling back to execute_values')
+                    method = 'values'
+            if method == 'values':
+                inserted = _execute_values_rows(cursor, rows, table)
+            with span("commit", rows=len(rows)):
+                conn.commit()
+            total += inserted
+            skipped += len(rows) - inserted
+            if changes is not None and inserted:
+                for row in rows:
+                    changes.add(row[CITY_INDEX], row[TIME_INDEX])
+            print(f"Inserted {total} rows so far")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f'Failed to bulk insert data into the database: {e}')
+        raise
+    finally:
+        cursor.close()
+
+    get_metrics().inc("weather_readings_inserted_total", total)
+    print(f"Bulk insert completed: {total} rows ({skipped} already stored)")
+    return total
+
+def add_time_info(data: dict, timezone_name=DEFAULT_TIMEZONE) -> dict:
     tz = pytz.timezone(timezone_name)
-    now = datetime.now(tz)
+    # Use the fetch time when known so replayed (cached) readings keep their original timestamp
+    fetched_at = data.get("fetched_at")
+    now = datetime.fromtimestamp(fetched_at, tz) if fetched_at else datetime.now(tz)
 
     data["timestamp"] = now.isoformat()
     data["utc_offset"] = now.strftime("%z")  # e.g. "+0200"
 
     return data
 
-def main():
-    city = 'Johannesburg'
+def fetch_readings(cities, use_cache=True, limiter=None):
+    """
+    Fetch weather for all cities concurrently and add time info to each
+    reading, localized to the city's own timezone (see locations.py)
+    """
+    results, failures = get_current_weather_many(cities, use_cache=use_cache, limiter=limiter)
+    for city, error in failures.items():
+        print(f"Failed to fetch weather data for {city}: {error}")
+    request_stats = get_request_stats()
+    if request_stats:
+        avg_latency = sum(stat['latency'] for stat in request_stats) / len(request_stats)
+        retries = sum(stat['retries'] for stat in request_stats)
+        cached = sum(1 for stat in request_stats if stat['cached'])
+        print(f"API requests: {len(request_stats)}, avg latency {avg_latency:.2f}s, retries {retries}, cache hits {cached}")
+    locations = get_locations()
+    readings = [add_time_info(results[city], locations.timezone(city)) for city in cities if city in results]
+    return readings, failures
+
+def fetch_due_readings(cities, scheduler=None):
+    """
+    Fetch every city or, with an adaptive scheduler, only the cities it says
+    are due, then feed the readings back so it can adapt their intervals.
+    Scheduled fetches skip the response cache: a replayed reading would look
+    unchanged and stretch the interval for nothing.
+    """
+    if scheduler is None:
+        return fetch_readings(cities)
+    due = scheduler.due()
+    if not due:
+        print("No cities due for a poll")
+        return [], {}
+    print(f"Polling {len(due)} of {len(cities)} cities: {', '.join(due)}")
+    try:
+        readings, failures = fetch_readings(due, use_cache=False, limiter=scheduler.limiter)
+    except Exception as e:
+        scheduler.record([], {city: str(e) for city in due})
+        raise
+    retries = sum(stat['retries'] for stat in get_request_stats())
+    scheduler.record(readings, failures, retries=retries)
+    return readings, failures
+
+def main(cities=None, adaptive=False):
+    cities = cities or get_cities()
+    scheduler = get_scheduler(cities) if adaptive else None
     conn = None
+    started = time.perf_counter()
+    status = "failure"
     try:
-        print(f"Starting weather data pipeline for {city}")
+        print(f"Starting weather data pipeline for {len(cities)} cities: {', '.join(cities)}")
         
-        # Fetch weather data
-        data = get_current_weather(city)
-        if not data:
-            print("Failed to fetch weather data, exiting")
+        # Fetch weather data for all cities concurrently
+        with span("fetch", cities=len(cities)):
+            readings, failures = fetch_due_readings(cities, scheduler)
+        # Spool readings first so they survive a database outage
+        spool.append(readings)
+        if not readings and not spool.pending_count():
+            if failures or scheduler is None:
+                print("Failed to fetch weather data, exiting")
+            else:
+                status = "success"
             return
-        
-        data = add_time_info(data)
 
         # Connect to database
-        conn = connect_db()
+        with span("db_connect"):
+            conn = connect_db()
         
-        # Create table if needed
-        create_table(conn)
+        # Create table if needed, plus this month's and upcoming partitions
+        with span("ddl"):
+            create_table(conn)
+            ensure_partitions(conn)
+            drop_old_partitions(conn)
         
-        # Insert data
-        insert_records(conn, data)
+        # Insert everything spooled, including readings left over from earlier runs
+        with span("insert"):
+            flush_and_notify(conn)
         
-        print("Weather data pipeline completed successfully")
+        status = "success" if not failures else "partial"
+        print(f"Weather data pipeline completed: {len(readings)} succeeded, {len(failures)} failed")
         
     except Exception as e:
         print(f'An error occurred during execution: {e}')
@@ -148,6 +431,139 @@ def main():
         if conn is not None:
             conn.close()
             print('Database connection closed')
+        record_run(status, time.perf_counter() - started)
+
+def flush_and_notify(conn):
+    """Flush the spool and tell listeners which cities and times were inserted"""
+    changes = ChangeSet()
+    flushed = spool.flush(conn, lambda conn, readings: insert_records_bulk(conn, readings, changes=changes))
+    if changes:
+        publish_changes(conn, "ingestion", [RAW_TABLE.split('.')[-1]], changes)
+    return flushed
+
+def fetch_and_spool(cities, scheduler=None):
+    """
+    Fetch (due) readings and append them to the spool without touching the
+    database. Returns whether the spool has anything to flush.
+    """
+    reset_request_stats()
+    with span("fetch", cities=len(cities)):
+        readings, failures = fetch_due_readings(cities, scheduler)
+    spool.append(readings)
+    if not readings and not spool.pending_count():
+        if failures or scheduler is None:
+            print("Failed to fetch weather data, skipping cycle")
+        return False
+    return True
+
+def open_pool():
+    """Create the connection pool and bring the schema up to date, closing the pool if that fails"""
+    with span("db_connect", pool=True):
+        pool = create_pool()
+    try:
+        conn = get_healthy_connection(pool)
+        try:
+            with span("ddl"):
+                create_table(conn)
+        finally:
+            pool.putconn(conn)
+    except Exception:
+        pool.closeall()
+        raise
+    return pool
+
+def flush_spooled(pool):
+    """Flush the spool on a pooled connection, creating partitions and applying retention first"""
+    with span("db_connect"):
+        conn = get_healthy_connection(pool)
+    broken = False
+    try:
+        # Both checks run at most once a day, so retention also applies to the daemon
+        with span("ddl"):
+            ensure_partitions(conn)
+            drop_old_partitions(conn)
+        with span("insert"):
+            return flush_and_notify(conn)
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken)
+
+def run_cycle(pool, cities, scheduler=None):
+    """Run one fetch/spool/flush cycle on a pooled connection"""
+    if not fetch_and_spool(cities, scheduler):
+        return 0
+    return flush_spooled(pool)
+
+def run_daemon(cities=None, interval=None, adaptive=False):
+    """
+    Keep ingesting on a fixed interval from a single long-running process.
+    The connection pool and table setup are created once; each cycle only
+    fetches and inserts. Readings are fetched and spooled before the
+    database is touched, so while it is down (even at startup) they pile
+    up in the spool and the pool is retried on the next cycle. Broken
+    connections are replaced on the next cycle and a failed cycle never
+    stops the daemon. SIGTERM/SIGINT stop it after the current cycle.
+    With adaptive=True there is no fixed interval: each cycle polls only
+    the cities the scheduler says are due and sleeps until the next one is
+    (see scheduler.py).
+    """
+    cities = cities or get_cities()
+    interval = interval or float(os.getenv("INGEST_INTERVAL") or DEFAULT_INTERVAL)
+    scheduler = get_scheduler(cities) if adaptive else None
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+
+    pool = None
+    if scheduler is not None:
+        print(f"Starting adaptive ingestion daemon for {len(cities)} cities, "
+              f"polling each every {scheduler.min_interval:.0f}-{scheduler.max_interval:.0f}s")
+    else:
+        print(f"Starting ingestion daemon for {len(cities)} cities every {interval:.0f}s")
+    metrics_server = serve_from_env()
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+            status = "failure"
+            try:
+                flushed = 0
+                if fetch_and_spool(cities, scheduler):
+                    if pool is None:
+                        pool = open_pool()
+                    flushed = flush_spooled(pool)
+                status = "success"
+                print(f"Cycle completed in {time.monotonic() - started:.2f}s: {flushed} readings flushed")
+            except psycopg2.Error as e:
+                print(f'Cycle failed with a database error ({spool.pending_count()} readings kept in the spool): {e}')
+            except Exception as e:
+                print(f'Cycle failed: {e}')
+            record_run(status, time.monotonic() - started)
+            if scheduler is not None:
+                wait = scheduler.seconds_until_next()
+                # A failed cycle can leave cities due; retry them after min_interval rather than spin
+                stop.wait(wait if status == "success" else max(wait, scheduler.min_interval))
+            else:
+                stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        if pool is not None:
+            pool.closeall()
+            print('Connection pool closed')
+        if metrics_server is not None:
+            metrics_server.shutdown()
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Fetch weather readings and load them into Postgres")
+    parser.add_argument("--daemon", action="store_true", help="keep running and ingest on an interval")
+    parser.add_argument("--interval", type=float, help=f"seconds between daemon cycles (default {DEFAULT_INTERVAL})")
+    parser.add_argument("--cities", help="comma separated list of cities (overrides CITIES)")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="poll each city on an interval adapted to how often its readings change")
+    args = parser.parse_args()
+
+    cities = [city.strip() for city in args.cities.split(",") if city.strip()] if args.cities else None
+    if args.daemon:
+        run_daemon(cities, args.interval, adaptive=args.adaptive)
+    else:
+        main(cities, adaptive=args.adaptive)
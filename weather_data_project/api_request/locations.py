@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+
+import requests
+
+from api_request import DEFAULT_TIMEOUT, get_session
+
+DEFAULT_GEOCODING_URL = "https://geocoding-api.open-meteo.com/v1/search"
+DEFAULT_LOCATIONS_PATH = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "locations.json")
+# Zone readings were localized to before cities were geocoded
+DEFAULT_TIMEZONE = "Africa/Johannesburg"
+
+def _get_json(url, params):
+    response = get_session().get(url, params=params, timeout=DEFAULT_TIMEOUT)
+    response.raise_for_status()
+    return response.json()
+
+class LocationCache:
+    """
+    (latitude, longitude, IANA timezone) per city from the Open-Meteo
+    geocoding API (GEOCODING_API_URL). Places don't move, so lookups are
+    kept in a JSON file without expiry and each city is geocoded once.
+    Live ingestion and backfill share it, so both localize a city's
+    readings to the same zone.
+    """
+
+    def __init__(self, path=DEFAULT_LOCATIONS_PATH):
+        self.path = path
+        self.url = os.getenv("GEOCODING_API_URL") or DEFAULT_GEOCODING_URL
+        self._locations = {}
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._locations = {city: tuple(location) for city, location in json.load(f).items()}
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable location cache {path}: {e}")
+
+    def locate(self, city, get_json=_get_json):
+        """
+        (latitude, longitude, IANA timezone) of the best match for city.
+        get_json(url, params) makes the request, so callers can put it
+        behind their own rate limit and retries. Raises LookupError when
+        nothing matches.
+        """
+        with self._lock:
+            if city in self._locations:
+                return self._locations[city]
+        data = get_json(self.url, {"name": city, "count": 1})
+        results = data.get("results") or []
+        if not results:
+            raise LookupError(f"Could not locate {city}")
+        match = results[0]
+        location = (match["latitude"], match["longitude"], match.get("timezone") or "UTC")
+        with self._lock:
+            self._locations[city] = location
+            saved = dict(self._locations)
+        self._save(saved)
+        return location
+
+    def _save(self, locations):
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(locations, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to write location cache {self.path}: {e}")
+
+    def timezone(self, city):
+        """
+        IANA timezone of city, falling back to DEFAULT_TIMEZONE (with a
+        warning) when it can't be geocoded; the lookup is retried next time.
+        """
+        try:
+            return self.locate(city)[2]
+        except (requests.exceptions.RequestException, LookupError, ValueError, KeyError) as e:
+            print(f"Could not look up the timezone of {city} ({e}), using {DEFAULT_TIMEZONE}")
+            return DEFAULT_TIMEZONE
+
+_locations = None
+_locations_lock = threading.Lock()
+
+def get_locations():
+    """
+    Return the process-wide location cache, configured from:
+    - LOCATIONS_PATH: JSON file the lookups are kept in
+    """
+    global _locations
+    with _locations_lock:
+        if _locations is None:
+            _locations = LocationCache(os.getenv("LOCATIONS_PATH") or DEFAULT_LOCATIONS_PATH)
+    return _locations
@@ -0,0 +1,220 @@
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = "weather_pipeline_stage_seconds"
+STAGE_FAILURES = "weather_pipeline_stage_failures_total"
+
+HELP = {
+    STAGE_SECONDS: "Time spent in each pipeline stage",
+    STAGE_FAILURES: "Pipeline stages that raised",
+    "weather_api_requests_total": "Weather API lookups by outcome (success, failure, cached)",
+    "weather_api_retries_total": "Weather API attempts that were retried",
+    "weather_api_request_seconds": "Weather API lookup latency including retries",
+    "weather_api_connect_seconds": "New API connections: DNS and TCP connect, then TLS handshake",
+    "weather_readings_inserted_total": "Readings inserted into raw_weather_data",
+    "weather_runs_total": "Ingestion runs and daemon cycles by status",
+    "weather_last_run_timestamp_seconds": "When the last ingestion run or cycle finished",
+    "weather_last_success_timestamp_seconds": "When the last successful ingestion run or cycle finished",
+    "weather_last_run_duration_seconds": "Duration of the last ingestion run or cycle",
+    "weather_readings_changed_total": "Adaptively scheduled readings by whether they differed from the last one",
+    "weather_poll_interval_seconds": "Current adaptive polling interval per city",
+    "weather_scheduler_skipped_total": "Due city polls skipped by the adaptive scheduler"
+}
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms for the ingestion pipeline,
+    rendered in the Prometheus text format.
+
+    Spans time a stage into the stage histogram and, when a JSON log is
+    configured, write one JSON line per finished span (and per event()).
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, log_path=None):
+        self.buckets = tuple(buckets)
+        self.log_path = log_path
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["counts"][i] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def span(self, stage, **fields):
+        """Time the block as stage; failures are counted and logged with the error"""
+        start = time.perf_counter()
+        status, error = "ok", None
+        try:
+            yield
+        except BaseException as e:
+            status, error = "error", repr(e)
+            self.inc(STAGE_FAILURES, stage=stage)
+            raise
+        finally:
+            seconds = time.perf_counter() - start
+            self.observe(STAGE_SECONDS, seconds, stage=stage)
+            self.event("span", stage=stage, seconds=round(seconds, 6), status=status, error=error, **fields)
+
+    def event(self, event, **fields):
+        """Write one structured JSON log line, if a log is configured"""
+        if not self.log_path:
+            return
+        record = {"ts": time.time(), "event": event, **{k: v for k, v in fields.items() if v is not None}}
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self.log_path == "-":
+                sys.stderr.write(line)
+                sys.stderr.flush()
+                return
+            try:
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except OSError as e:
+                print(f"Failed to write metrics log {self.log_path}: {e}")
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            histograms = {key: {**value, "counts": list(value["counts"])} for key, value in self._histograms.items()}
+        lines = []
+        seen = set()
+
+        def header(name, kind):
+            if name not in seen:
+                seen.add(name)
+                if name in HELP:
+                    lines.append(f"# HELP {name} {HELP[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, key), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{_format_labels(key)} {value}")
+        for (name, key), histogram in sorted(histograms.items()):
+            header(name, "histogram")
+            for bound, count in zip(self.buckets, histogram["counts"]):
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', str(bound))])} {count}")
+            lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {histogram['count']}")
+            lines.append(f"{name}_sum{_format_labels(key)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(key)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically write the metrics for node_exporter's textfile collector"""
+        directory = os.path.dirname(path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Failed to write metrics textfile {path}: {e}")
+
+    def serve(self, port, host="0.0.0.0"):
+        """Serve /metrics on a daemon thread; returns the server"""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        print(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+        return server
+
+_registry = None
+_registry_lock = threading.Lock()
+
+def get_metrics():
+    """
+    Return the process-wide metrics registry, configured from:
+    - METRICS_LOG: file to append JSON log lines to ("-" for stderr)
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MetricsRegistry(log_path=os.getenv("METRICS_LOG") or None)
+    return _registry
+
+def span(stage, **fields):
+    return get_metrics().span(stage, **fields)
+
+def record_run(status, seconds):
+    """Count a finished run or daemon cycle and export the metrics"""
+    metrics = get_metrics()
+    now = time.time()
+    metrics.inc("weather_runs_total", status=status)
+    metrics.set_gauge("weather_last_run_timestamp_seconds", now)
+    metrics.set_gauge("weather_last_run_duration_seconds", seconds)
+    if status == "success":
+        metrics.set_gauge("weather_last_success_timestamp_seconds", now)
+    metrics.event("run", status=status, seconds=round(seconds, 6))
+    export()
+
+def export():
+    """Write the Prometheus textfile if METRICS_TEXTFILE is set"""
+    path = os.getenv("METRICS_TEXTFILE")
+    if path:
+        get_metrics().write_textfile(path)
+
+def serve_from_env():
+    """Start the /metrics endpoint if METRICS_PORT is set"""
+    port = os.getenv("METRICS_PORT")
+    return get_metrics().serve(int(port)) if port else None
@@ -0,0 +1,334 @@
+import threading
+
+import psycopg2
+
+SCHEMA_VERSION_TABLE = 'dev.schema_version'
+MIGRATION_LOCK_ID = 724501  # pg_advisory_lock key shared by all ingestion processes
+
+# Ordered list of (version, description, sql). Never edit a shipped step;
+# append a new one instead.
+MIGRATIONS = [
+    (1, "Create dev schema and raw_weather_data table", """
+        CREATE SCHEMA IF NOT EXISTS dev;
+
+        CREATE TABLE IF NOT EXISTS dev.raw_weather_data (
+            id SERIAL PRIMARY KEY,
+            city TEXT,
+            temperature FLOAT,
+            weather_description TEXT,
+            wind_speed TEXT,
+            time TIMESTAMP,
+            time_inserted TIMESTAMP,
+            utc_offset TEXT
+        );
+    """),
+    (2, "Add ingest_key idempotency column to raw_weather_data", """
+        ALTER TABLE dev.raw_weather_data ADD COLUMN IF NOT EXISTS ingest_key TEXT;
+
+        CREATE UNIQUE INDEX IF NOT EXISTS raw_weather_data_ingest_key_idx
+            ON dev.raw_weather_data (ingest_key);
+    """),
+    (3, "Stamp time_inserted at insert time and index it for incremental dbt runs", """
+        ALTER TABLE dev.raw_weather_data ALTER COLUMN time_inserted SET DEFAULT now();
+
+        CREATE INDEX IF NOT EXISTS raw_weather_data_time_inserted_idx
+            ON dev.raw_weather_data (time_inserted);
+    """),
+    (4, "Partition raw_weather_data by month on time, with BRIN and (city, time) indexes", """
+        -- Creates the partition for one month, moving any rows for that
+        -- month out of the default partition first
+        CREATE OR REPLACE FUNCTION dev.create_raw_weather_partition(month_start DATE)
+        RETURNS VOID AS $$
+        DECLARE
+            partition_name TEXT := format('raw_weather_data_%s', to_char(month_start, 'YYYY_MM'));
+            month_end DATE := (date_trunc('month', month_start) + INTERVAL '1 month')::DATE;
+        BEGIN
+            month_start := date_trunc('month', month_start)::DATE;
+            IF to_regclass(format('dev.%I', partition_name)) IS NOT NULL THEN
+                RETURN;
+            END IF;
+
+            CREATE TEMP TABLE IF NOT EXISTS raw_weather_partition_move
+                (LIKE dev.raw_weather_data) ON COMMIT DROP;
+            WITH moved AS (
+                DELETE FROM dev.raw_weather_data_default
+                WHERE time >= month_start AND time < month_end
+                RETURNING *
+            )
+            INSERT INTO raw_weather_partition_move SELECT * FROM moved;
+
+            EXECUTE format(
+                'CREATE TABLE dev.%I PARTITION OF dev.raw_weather_data FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+
+            INSERT INTO dev.raw_weather_data SELECT * FROM raw_weather_partition_move;
+            TRUNCATE raw_weather_partition_move;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        ALTER TABLE dev.raw_weather_data RENAME TO raw_weather_data_heap;
+
+        CREATE TABLE dev.raw_weather_data (
+            id INTEGER NOT NULL DEFAULT nextval('dev.raw_weather_data_id_seq'),
+            city TEXT,
+            temperature FLOAT,
+            weather_description TEXT,
+            wind_speed TEXT,
+            time TIMESTAMP NOT NULL,
+            time_inserted TIMESTAMP DEFAULT now(),
+            utc_offset TEXT,
+            ingest_key TEXT,
+            PRIMARY KEY (id, time)
+        ) PARTITION BY RANGE (time);
+
+        ALTER SEQUENCE dev.raw_weather_data_id_seq OWNED BY dev.raw_weather_data.id;
+
+        CREATE TABLE dev.raw_weather_data_default PARTITION OF dev.raw_weather_data DEFAULT;
+
+        SELECT dev.create_raw_weather_partition(month::DATE)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT MIN(time) FROM dev.raw_weather_data_heap), now())),
+            date_trunc('month', now()) + INTERVAL '2 months',
+            INTERVAL '1 month'
+        ) AS month;
+
+        INSERT INTO dev.raw_weather_data (
+            id, city, temperature, weather_description, wind_speed,
+            time, time_inserted, utc_offset, ingest_key
+        )
+        SELECT
+            id, city, temperature, weather_description, wind_speed,
+            time, time_inserted, utc_offset, ingest_key
+        FROM dev.raw_weather_data_heap;
+
+        DROP TABLE dev.raw_weather_data_heap;
+
+        -- Unique indexes on a partitioned table must include the partition key
+        CREATE UNIQUE INDEX raw_weather_data_ingest_key_idx
+            ON dev.raw_weather_data (ingest_key, time);
+        CREATE INDEX raw_weather_data_time_inserted_idx
+            ON dev.raw_weather_data (time_inserted);
+        CREATE INDEX raw_weather_data_city_time_idx
+            ON dev.raw_weather_data (city, time);
+        CREATE INDEX raw_weather_data_time_brin_idx
+            ON dev.raw_weather_data USING BRIN (time);
+    """),
+    (5, "Store typed values: numeric wind_speed, timestamptz times, utc_offset in seconds", """
+        -- Partition bounds are now instants, pinned to UTC month boundaries
+        CREATE OR REPLACE FUNCTION dev.create_raw_weather_partition(month_start DATE)
+        RETURNS VOID AS $$
+        DECLARE
+            partition_name TEXT := format('raw_weather_data_%s', to_char(month_start, 'YYYY_MM'));
+            lower_bound TIMESTAMPTZ := date_trunc('month', month_start)::TIMESTAMP AT TIME ZONE 'UTC';
+            upper_bound TIMESTAMPTZ := (date_trunc('month', month_start) + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+        BEGIN
+            IF to_regclass(format('dev.%I', partition_name)) IS NOT NULL THEN
+                RETURN;
+            END IF;
+
+            CREATE TEMP TABLE IF NOT EXISTS raw_weather_partition_move
+                (LIKE dev.raw_weather_data) ON COMMIT DROP;
+            WITH moved AS (
+                DELETE FROM dev.raw_weather_data_default
+                WHERE time >= lower_bound AND time < upper_bound
+                RETURNING *
+            )
+            INSERT INTO raw_weather_partition_move SELECT * FROM moved;
+
+            EXECUTE format(
+                'CREATE TABLE dev.%I PARTITION OF dev.raw_weather_data FOR VALUES FROM (%L) TO (%L)',
+                partition_name, lower_bound, upper_bound
+            );
+
+            INSERT INTO dev.raw_weather_data SELECT * FROM raw_weather_partition_move;
+            TRUNCATE raw_weather_partition_move;
+        END;
+        $$ LANGUAGE plpgsql;
+
+        -- time is the partition key, so its type can't be altered in place:
+        -- convert the rows into a scratch table and rebuild the partitions.
+        -- Old rows stored local wall time with the offset as text ("+0200").
+        -- time_inserted was written from the same local timestamp as time
+        -- until migration 3, so those rows convert with their own offset.
+        -- Later rows got now() in the zone ingestion sessions start in (they
+        -- never set one): the session's reset value, which a SET TimeZone by
+        -- whoever runs this migration doesn't change.
+        CREATE TEMP TABLE raw_weather_data_typed ON COMMIT DROP AS
+        SELECT
+            id,
+            city,
+            -- Like insert_data._to_float: take the number out of values such as
+            -- "12 km/h" and leave ones without a number ("None") NULL. The groups
+            -- are non-capturing so substring() returns the whole match.
+            substring(temperature::TEXT FROM '-?[0-9]+(?:[.][0-9]+)?(?:[eE][-+]?[0-9]+)?')::DOUBLE PRECISION AS temperature,
+            weather_description,
+            substring(wind_speed::TEXT FROM '-?[0-9]+(?:[.][0-9]+)?(?:[eE][-+]?[0-9]+)?')::DOUBLE PRECISION AS wind_speed,
+            offset_seconds AS utc_offset,
+            (time - make_interval(secs => COALESCE(offset_seconds, 0))) AT TIME ZONE 'UTC' AS time,
+            CASE
+                WHEN time_inserted = time THEN
+                    (time_inserted - make_interval(secs => COALESCE(offset_seconds, 0))) AT TIME ZONE 'UTC'
+                ELSE
+                    time_inserted AT TIME ZONE (SELECT reset_val FROM pg_settings WHERE name = 'TimeZone')
+            END AS time_inserted,
+            ingest_key
+        FROM (
+            SELECT
+                *,
+                CASE WHEN utc_offset ~ '^[+-][0-9]{4}$' THEN
+                    (CASE WHEN left(utc_offset, 1) = '-' THEN -1 ELSE 1 END)
+                    * (substr(utc_offset, 2, 2)::INTEGER * 3600 + substr(utc_offset, 4, 2)::INTEGER * 60)
+                END AS offset_seconds
+            FROM dev.raw_weather_data
+        ) AS raw;
+
+        ALTER SEQUENCE dev.raw_weather_data_id_seq OWNED BY NONE;
+        DROP TABLE dev.raw_weather_data;
+
+        CREATE TABLE dev.raw_weather_data (
+            id INTEGER NOT NULL DEFAULT nextval('dev.raw_weather_data_id_seq'),
+            city TEXT,
+            temperature DOUBLE PRECISION,
+            weather_description TEXT,
+            wind_speed DOUBLE PRECISION,
+            time TIMESTAMPTZ NOT NULL,
+            time_inserted TIMESTAMPTZ DEFAULT now(),
+            utc_offset INTEGER,
+            ingest_key TEXT,
+            PRIMARY KEY (id, time)
+        ) PARTITION BY RANGE (time);
+
+        ALTER SEQUENCE dev.raw_weather_data_id_seq OWNED BY dev.raw_weather_data.id;
+
+        CREATE TABLE dev.raw_weather_data_default PARTITION OF dev.raw_weather_data DEFAULT;
+
+        SELECT dev.create_raw_weather_partition(month::DATE)
+        FROM generate_series(
+            date_trunc('month', COALESCE((SELECT MIN(time) FROM raw_weather_data_typed), now()) AT TIME ZONE 'UTC'),
+            date_trunc('month', now() AT TIME ZONE 'UTC') + INTERVAL '2 months',
+            INTERVAL '1 month'
+        ) AS month;
+
+        INSERT INTO dev.raw_weather_data (
+            id, city, temperature, weather_description, wind_speed,
+            time, time_inserted, utc_offset, ingest_key
+        )
+        SELECT
+            id, city, temperature, weather_description, wind_speed,
+            time, time_inserted, utc_offset, ingest_key
+        FROM raw_weather_data_typed;
+
+        CREATE UNIQUE INDEX raw_weather_data_ingest_key_idx
+            ON dev.raw_weather_data (ingest_key, time);
+        CREATE INDEX raw_weather_data_time_inserted_idx
+            ON dev.raw_weather_data (time_inserted);
+        CREATE INDEX raw_weather_data_city_time_idx
+            ON dev.raw_weather_data (city, time);
+        CREATE INDEX raw_weather_data_time_brin_idx
+            ON dev.raw_weather_data USING BRIN (time);
+    """),
+    (6, "Enforce one reading per (city, time)", """
+        -- Keep the first stored reading of any duplicates, like staging used to
+        DELETE FROM dev.raw_weather_data AS raw
+        USING (
+            SELECT
+                id,
+                time,
+                ROW_NUMBER() OVER (PARTITION BY city, time ORDER BY time_inserted NULLS LAST, id) AS rn
+            FROM dev.raw_weather_data
+        ) AS ranked
+        WHERE raw.id = ranked.id
+          AND raw.time = ranked.time
+          AND ranked.rn > 1;
+
+        DROP INDEX IF EXISTS dev.raw_weather_data_city_time_idx;
+        CREATE UNIQUE INDEX raw_weather_data_city_time_key
+            ON dev.raw_weather_data (city, time);
+
+        -- ingest_key is derived from city and time, so its own unique index
+        -- only adds write cost now
+        DROP INDEX IF EXISTS dev.raw_weather_data_ingest_key_idx;
+    """),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+_verified = set()
+_verified_lock = threading.Lock()
+
+def _database_key(conn):
+    info = conn.info
+    return (info.host, info.port, info.dbname)
+
+def get_schema_version(conn):
+    """Return the applied schema version, 0 if the registry doesn't exist yet"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT COALESCE(MAX(version), 0) FROM {SCHEMA_VERSION_TABLE}")
+            version = cursor.fetchone()[0]
+        conn.commit()
+        return version
+    except psycopg2.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+def migrate(conn):
+    """
+    Apply all pending migrations, each in its own transaction.
+    An advisory lock serialises concurrent runners (hourly job, daemon,
+    backfills) so a step is never applied twice.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            cursor.execute(
+                f"""
+                CREATE SCHEMA IF NOT EXISTS dev;
+                CREATE TABLE IF NOT EXISTS {SCHEMA_VERSION_TABLE} (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                );
+                """
+            )
+            conn.commit()
+
+            current = get_schema_version(conn)
+            for version, description, sql in MIGRATIONS:
+                if version <= current:
+                    continue
+                print(f"Applying migration {version}: {description}")
+                try:
+                    cursor.execute(sql)
+                    cursor.execute(
+                        f"INSERT INTO {SCHEMA_VERSION_TABLE} (version, description) VALUES (%s, %s)",
+                        (version, description)
+                    )
+                    conn.commit()
+                except psycopg2.Error as e:
+                    conn.rollback()
+                    print(f'Migration {version} failed: {e}')
+                    raise
+        finally:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+
+def ensure_schema(conn):
+    """
+    Make sure the database is at LATEST_VERSION.
+    The registry is read at most once per database per process; after that
+    this is a no-op, so long-running processes pay nothing on the hot path.
+    """
+    key = _database_key(conn)
+    with _verified_lock:
+        if key in _verified:
+            return
+    version = get_schema_version(conn)
+    if version < LATEST_VERSION:
+        print(f"Schema at version {version}, migrating to {LATEST_VERSION}...")
+        migrate(conn)
+    elif version > LATEST_VERSION:
+        print(f"Warning: database schema version {version} is newer than this code ({LATEST_VERSION})")
+    with _verified_lock:
+        _verified.add(key)
@@ -0,0 +1,153 @@
+"""
+Publish Postgres NOTIFY messages when new data lands, so the dashboard can
+invalidate only what changed instead of polling.
+
+Payloads are JSON:
+    {"source": "ingestion" | "dbt", "models": [...], "cities": [...],
+     "start": "...", "end": "..."}
+start/end bound the changed values of the model's own time column (UTC
+instants for raw_weather_data, local wall-clock time for the dbt models).
+A missing cities, start or end means "any".
+
+After a dbt run, publish what it changed from its run_results.json:
+
+    python notifications.py --run-results ../my_project/target/run_results.json
+"""
+import argparse
+import json
+import os
+from datetime import datetime, timedelta
+
+import psycopg2
+
+DEFAULT_CHANNEL = 'weather_data_changed'
+# NOTIFY payloads must stay under 8000 bytes; beyond this many cities the
+# list is dropped and listeners treat the change as covering every city
+MAX_PAYLOAD_CITIES = 100
+# run_results.json only records when the run finished and how long it took,
+# so the staging lookup starts a little before the computed start
+RUN_START_SLACK = timedelta(minutes=1)
+
+def get_channel():
+    return os.getenv("NOTIFY_CHANNEL") or DEFAULT_CHANNEL
+
+class ChangeSet:
+    """Cities and time range touched by a load"""
+
+    def __init__(self):
+        self.cities = set()
+        self.start = None
+        self.end = None
+        self.rows = 0
+
+    def add(self, city, time):
+        self.cities.add(city)
+        self.start = time if self.start is None else min(self.start, time)
+        self.end = time if self.end is None else max(self.end, time)
+        self.rows += 1
+
+    def merge(self, other):
+        """Fold another ChangeSet (e.g. from a parallel load) into this one"""
+        if not other:
+            return
+        self.cities |= other.cities
+        self.start = other.start if self.start is None else min(self.start, other.start)
+        self.end = other.end if self.end is None else max(self.end, other.end)
+        self.rows += other.rows
+
+    def __bool__(self):
+        return self.rows > 0
+
+def publish_changes(conn, source, models, changes=None):
+    """
+    NOTIFY listeners that models changed, optionally narrowed to the cities
+    and time range in changes. A failed notification is logged and never
+    fails the load that produced the data.
+    """
+    payload = {"source": source, "models": sorted(models)}
+    if changes:
+        if len(changes.cities) <= MAX_PAYLOAD_CITIES:
+            payload["cities"] = sorted(changes.cities)
+        payload["start"] = changes.start.isoformat()
+        payload["end"] = changes.end.isoformat()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", (get_channel(), json.dumps(payload)))
+        conn.commit()
+        print(f"Published change notification for {', '.join(payload['models'])}")
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f'Failed to publish change notification: {e}')
+
+def _relation_name(result, default_schema):
+    relation = result.get("relation_name")
+    if relation:
+        # '"db"."schema"."table"' -> 'schema.table'
+        return ".".join(part.strip('"') for part in relation.split(".")[-2:])
+    return f"{default_schema}.{result['unique_id'].split('.')[-1]}"
+
+def changes_from_run_results(conn, path, schema=None):
+    """
+    Read a dbt run_results.json and return (models, changes).
+
+    models are the models that ran successfully and wrote rows. changes
+    holds the cities and local time range of the readings staged by that
+    run, taken from the staging model.
+    """
+    schema = schema or os.getenv("DB_SCHEMA") or "dev"
+    with open(path, "r", encoding="utf-8") as f:
+        run_results = json.load(f)
+
+    models = []
+    staging_relation = None
+    for result in run_results.get("results", []):
+        if not result["unique_id"].startswith("model.") or result.get("status") != "success":
+            continue
+        name = result["unique_id"].split(".")[-1]
+        rows_affected = (result.get("adapter_response") or {}).get("rows_affected")
+        if rows_affected == 0:
+            continue
+        models.append(name)
+        if name == "staging":
+            staging_relation = _relation_name(result, schema)
+
+    changes = ChangeSet()
+    if staging_relation:
+        metadata = run_results.get("metadata", {})
+        finished = datetime.fromisoformat(metadata["generated_at"].replace("Z", "+00:00"))
+        started = finished - timedelta(seconds=run_results.get("elapsed_time", 0)) - RUN_START_SLACK
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT city, MIN(weather_time_local), MAX(weather_time_local)
+                FROM {staging_relation}
+                WHERE staged_at >= %s
+                GROUP BY city
+                """,
+                (started,)
+            )
+            for city, first, last in cursor.fetchall():
+                changes.add(city, first)
+                changes.add(city, last)
+        conn.commit()
+    return models, changes
+
+def main():
+    from insert_data import connect_db
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--run-results", required=True, help="path to dbt's target/run_results.json")
+    args = parser.parse_args()
+
+    conn = connect_db()
+    try:
+        models, changes = changes_from_run_results(conn, args.run_results)
+        if not models:
+            print("dbt run changed no models, nothing to publish")
+            return
+        publish_changes(conn, "dbt", models, changes)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
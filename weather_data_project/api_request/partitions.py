@@ -0,0 +1,128 @@
+import os
+import threading
+from datetime import date
+
+import psycopg2
+
+DEFAULT_MONTHS_AHEAD = 2
+# Tries when another process creates the same partition concurrently
+CREATE_ATTEMPTS = 3
+
+_checked_on = {}
+_pruned_on = {}
+_checked_lock = threading.Lock()
+
+def _month_start(value):
+    return date(value.year, value.month, 1)
+
+def ensure_partitions(conn, start=None, end=None, months_ahead=None):
+    """
+    Make sure monthly partitions of dev.raw_weather_data exist from start's
+    month (default: this month) until months_ahead months past end (default:
+    today). Rows that already landed in the default partition for those
+    months are moved into the new partitions.
+
+    Without an explicit range the check runs at most once a day per database,
+    so the daemon can call it every cycle.
+    """
+    months_ahead = DEFAULT_MONTHS_AHEAD if months_ahead is None else months_ahead
+    today = date.today()
+    routine = start is None and end is None
+    key = (conn.info.host, conn.info.port, conn.info.dbname)
+    if routine:
+        with _checked_lock:
+            if _checked_on.get(key) == today:
+                return
+    start = _month_start(start or today)
+    end = _month_start(end or today)
+
+    for attempt in range(CREATE_ATTEMPTS):
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    SELECT dev.create_raw_weather_partition(month::DATE)
+                    FROM generate_series(
+                        %s::DATE,
+                        %s::DATE + make_interval(months => %s),
+                        INTERVAL '1 month'
+                    ) AS month
+                    """,
+                    (start, end, months_ahead)
+                )
+            conn.commit()
+            break
+        except (psycopg2.errors.DuplicateTable, psycopg2.errors.UniqueViolation) as e:
+            # Another process created the same partition first (depending on
+            # timing Postgres reports it as either error); the retry skips it
+            conn.rollback()
+            if attempt == CREATE_ATTEMPTS - 1:
+                print(f'Failed to create partitions: {e}')
+                raise
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f'Failed to create partitions: {e}')
+            raise
+
+    if routine:
+        with _checked_lock:
+            _checked_on[key] = today
+
+def drop_old_partitions(conn, keep_months=None):
+    """
+    Drop monthly partitions that start more than keep_months months before
+    the current month.
+    keep_months defaults to RETENTION_MONTHS; when neither is set nothing is
+    dropped. Dropping a partition is a metadata operation, so retention costs
+    the same no matter how large the table is. Returns the dropped names.
+
+    Without an explicit keep_months the check runs at most once a day per
+    database, so the daemon can call it every cycle.
+    """
+    routine = keep_months is None
+    if routine:
+        keep_months = os.getenv("RETENTION_MONTHS") or None
+    if keep_months is None:
+        return []
+    today = date.today()
+    key = (conn.info.host, conn.info.port, conn.info.dbname)
+    if routine:
+        with _checked_lock:
+            if _pruned_on.get(key) == today:
+                return []
+    cutoff = _month_start(today)
+    months = cutoff.year * 12 + cutoff.month - 1 - int(keep_months)
+    cutoff = date(months // 12, months % 12 + 1, 1)
+
+    dropped = []
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT child.relname
+                FROM pg_inherits
+                JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                JOIN pg_namespace ns ON ns.oid = parent.relnamespace
+                WHERE ns.nspname = 'dev'
+                  AND parent.relname = 'raw_weather_data'
+                  AND child.relname ~ '^raw_weather_data_[0-9]{4}_[0-9]{2}$'
+                """
+            )
+            for (name,) in cursor.fetchall():
+                year, month = int(name[-7:-3]), int(name[-2:])
+                if date(year, month, 1) < cutoff:
+                    cursor.execute(f'DROP TABLE dev."{name}"')
+                    dropped.append(name)
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        print(f'Failed to drop old partitions: {e}')
+        raise
+
+    if routine:
+        with _checked_lock:
+            _pruned_on[key] = today
+    if dropped:
+        print(f"Dropped {len(dropped)} partitions older than {cutoff}: {', '.join(sorted(dropped))}")
+    return dropped
@@ -0,0 +1,55 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: tokens refill at rate per second up to
+    capacity, and each call spends one. Bursts up to capacity go through
+    at once; sustained use is held to rate.
+    """
+
+    def __init__(self, rate, capacity=None):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive: {rate}")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Spend tokens if they are available right now"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, stop=None):
+        """
+        Wait until tokens are available and spend them. Returns False
+        without spending if the stop event is set first.
+        """
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait = (tokens - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self._tokens
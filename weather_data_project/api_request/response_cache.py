@@ -0,0 +1,131 @@
+import atexit
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "responses.json")
+DEFAULT_TTL = 600
+DEFAULT_MAX_ENTRIES = 1000
+
+class ResponseCache:
+    """
+    File-backed TTL cache for API responses with LRU eviction.
+    Entries are kept in least-recently-used order and written to a JSON file
+    (on save() and at exit) so reruns and backfills within the TTL don't hit
+    the API again.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def make_key(location, params=None):
+        """Build a cache key from the location and the request params"""
+        payload = json.dumps({"location": location, "params": params or {}}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable response cache {self.path}: {e}")
+            return
+        now = time.time()
+        for key, entry in entries.items():
+            if now - entry["stored_at"] < self.ttl:
+                self._entries[key] = entry
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """Return the cached data for key, or None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["stored_at"] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                    self._dirty = True
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._dirty = True
+            self.hits += 1
+            data = entry["data"]
+            return dict(data) if isinstance(data, dict) else data
+
+    def set(self, key, data):
+        with self._lock:
+            self._entries[key] = {"stored_at": time.time(), "data": data}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty = True
+        self.save()
+
+    def save(self):
+        """Atomically write the cache to disk if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            entries = dict(self._entries)
+            self._dirty = False
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Failed to write response cache {self.path}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def cache_bypassed():
+    """Whether the cache is disabled through WEATHER_CACHE_BYPASS"""
+    return os.getenv("WEATHER_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+def get_cache():
+    """
+    Return the process-wide response cache, configured from:
+    - WEATHER_CACHE_PATH
+    - WEATHER_CACHE_TTL (seconds)
+    - WEATHER_CACHE_MAX_ENTRIES
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                path=os.getenv("WEATHER_CACHE_PATH") or DEFAULT_CACHE_PATH,
+                ttl=float(os.getenv("WEATHER_CACHE_TTL") or DEFAULT_TTL),
+                max_entries=int(os.getenv("WEATHER_CACHE_MAX_ENTRIES") or DEFAULT_MAX_ENTRIES)
+            )
+            atexit.register(_cache.save)
+    return _cache
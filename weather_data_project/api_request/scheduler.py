@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from metrics import get_metrics
+from rate_limit import TokenBucket
+
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "scheduler.json")
+DEFAULT_MIN_INTERVAL = 900
+DEFAULT_MAX_INTERVAL = 6 * 3600
+DEFAULT_RATE_LIMIT = 1.0
+# Interval growth after an unchanged reading, and the cut after an unusual change
+GROWTH = 1.5
+SHRINK = 0.5
+# Temperatures kept per city for the variance estimate
+HISTORY = 12
+# Spread (°C) at which a city's target interval is half the maximum
+VOLATILITY_SCALE = 1.0
+
+def reading_hash(data):
+    """Hash of what a reading says, ignoring when it was fetched"""
+    payload = json.dumps(
+        [data.get("temperature"), data.get("description"), data.get("wind_speed")], default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def _as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+class AdaptiveScheduler:
+    """
+    Decides which cities to poll and when, from what their readings did.
+
+    Each city keeps the hash of its last reading, its recent temperatures
+    and a polling interval between min_interval and max_interval:
+    - an unchanged reading grows the interval by GROWTH, since the call
+      bought nothing;
+    - a new description or a temperature jump beyond twice the recent
+      spread halves it, so volatile spells are sampled closely;
+    - any other change moves it halfway to a target that falls as the
+      city's recent spread rises.
+    Failed fetches are retried after min_interval.
+
+    With a daily_quota, intervals are stretched so the projected calls
+    per day fit the budget, and no city is due once the day's budget is
+    spent. The token bucket (rate_limit calls per second) is shared by all
+    fetches. State is saved to state_path so one-shot runs keep it.
+    """
+
+    def __init__(self, cities, min_interval=DEFAULT_MIN_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL,
+                 rate_limit=DEFAULT_RATE_LIMIT, daily_quota=None, state_path=DEFAULT_STATE_PATH):
+        if min_interval > max_interval:
+            raise ValueError(f"min_interval {min_interval} is above max_interval {max_interval}")
+        self.cities = list(dict.fromkeys(cities))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.daily_quota = daily_quota
+        self.state_path = state_path
+        self.limiter = TokenBucket(rate_limit)
+        self._state = {}
+        self._calls = {"day": None, "count": 0}
+        self._lock = threading.Lock()
+        self._load()
+        for city in self.cities:
+            self._state.setdefault(city, self._new_state())
+
+    def _new_state(self):
+        return {"interval": self.min_interval, "next_due": 0.0, "hash": None, "description": None,
+                "temps": deque(maxlen=HISTORY)}
+
+    def _load(self):
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable scheduler state {self.state_path}: {e}")
+            return
+        self._calls = saved.get("calls", self._calls)
+        for city, state in saved.get("cities", {}).items():
+            self._state[city] = {
+                "interval": min(self.max_interval, max(self.min_interval, state["interval"])),
+                "next_due": state["next_due"],
+                "hash": state["hash"],
+                "description": state.get("description"),
+                "temps": deque(state["temps"], maxlen=HISTORY)
+            }
+
+    def save(self):
+        """Atomically write the per-city state"""
+        if not self.state_path:
+            return
+        with self._lock:
+            saved = {
+                "calls": dict(self._calls),
+                "cities": {city: {**state, "temps": list(state["temps"])} for city, state in self._state.items()}
+            }
+        directory = os.path.dirname(self.state_path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(saved, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            print(f"Failed to write scheduler state {self.state_path}: {e}")
+
+    def _today(self):
+        return datetime.now(timezone.utc).date().isoformat()
+
+    def _quota_left(self):
+        if self.daily_quota is None:
+            return None
+        if self._calls["day"] != self._today():
+            self._calls = {"day": self._today(), "count": 0}
+        return self.daily_quota - self._calls["count"]
+
+    def _quota_factor(self):
+        """How much every interval must stretch for a day of polling to fit the quota"""
+        if not self.daily_quota:
+            return 1.0
+        projected = sum(86400 / self._state[city]["interval"] for city in self.cities)
+        return max(1.0, projected / self.daily_quota)
+
+    def due(self, now=None):
+        """Cities whose next poll is due, most overdue first, capped by the day's remaining quota"""
+        now = time.time() if now is None else now
+        with self._lock:
+            due = sorted((city for city in self.cities if self._state[city]["next_due"] <= now),
+                         key=lambda city: self._state[city]["next_due"])
+            left = self._quota_left()
+            if left is not None and len(due) > left:
+                get_metrics().inc("weather_scheduler_skipped_total", len(due) - max(0, left), reason="quota")
+                due = due[:max(0, left)]
+            if left is not None:
+                self._calls["count"] += len(due)
+        return due
+
+    def seconds_until_next(self, now=None):
+        """Seconds until the next city is due (or the quota resets, if it is spent)"""
+        now = time.time() if now is None else now
+        with self._lock:
+            left = self._quota_left()
+            if left is not None and left <= 0:
+                midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+                return max(1.0, midnight + 86400 - now)
+            next_due = min((self._state[city]["next_due"] for city in self.cities), default=now)
+        return max(0.0, next_due - now)
+
+    def _adapt(self, state, data):
+        new_hash = reading_hash(data)
+        temperature = _as_float(data.get("temperature"))
+        temps = state["temps"]
+        spread = statistics.pstdev(temps) if len(temps) >= 2 else 0.0
+        if new_hash == state["hash"]:
+            interval, changed = state["interval"] * GROWTH, False
+        else:
+            changed = True
+            jump = abs(temperature - temps[-1]) if temperature is not None and temps else 0.0
+            old_description = state["description"]
+            if (old_description is not None and data.get("description") != old_description) or jump > 2 * max(spread, VOLATILITY_SCALE):
+                interval = state["interval"] * SHRINK
+            else:
+                target = self.max_interval / (1 + spread / VOLATILITY_SCALE)
+                interval = (state["interval"] + target) / 2
+        state["hash"] = new_hash
+        state["description"] = data.get("description")
+        if temperature is not None:
+            temps.append(temperature)
+        state["interval"] = min(self.max_interval, max(self.min_interval, interval))
+        return changed
+
+    def record(self, readings, failures=None, retries=0, now=None):
+        """
+        Update each city from the readings fetched for it and schedule its
+        next poll. retries are charged to the day's quota on top of the
+        one call per city counted by due().
+        """
+        now = time.time() if now is None else now
+        metrics = get_metrics()
+        with self._lock:
+            if retries and self._quota_left() is not None:
+                self._calls["count"] += retries
+            for data in readings:
+                state = self._state.get(data["location"])
+                if state is None:
+                    continue
+                changed = self._adapt(state, data)
+                metrics.inc("weather_readings_changed_total", changed=str(changed).lower())
+            factor = self._quota_factor()
+            for data in readings:
+                state = self._state.get(data["location"])
+                if state is not None:
+                    state["next_due"] = now + state["interval"] * factor
+                    metrics.set_gauge("weather_poll_interval_seconds", state["interval"] * factor, city=data["location"])
+            for city in failures or ():
+                if city in self._state:
+                    self._state[city]["next_due"] = now + self.min_interval
+        self.save()
+
+def get_scheduler(cities):
+    """
+    Build the adaptive scheduler for cities, configured from:
+    - ADAPTIVE_MIN_INTERVAL / ADAPTIVE_MAX_INTERVAL (seconds)
+    - API_RATE_LIMIT (calls per second)
+    - API_DAILY_QUOTA (calls per UTC day; unlimited if unset)
+    - SCHEDULER_STATE_PATH
+    """
+    quota = os.getenv("API_DAILY_QUOTA")
+    return AdaptiveScheduler(
+        cities,
+        min_interval=float(os.getenv("ADAPTIVE_MIN_INTERVAL") or DEFAULT_MIN_INTERVAL),
+        max_interval=float(os.getenv("ADAPTIVE_MAX_INTERVAL") or DEFAULT_MAX_INTERVAL),
+        rate_limit=float(os.getenv("API_RATE_LIMIT") or DEFAULT_RATE_LIMIT),
+        daily_quota=int(quota) if quota else None,
+        state_path=os.getenv("SCHEDULER_STATE_PATH") or DEFAULT_STATE_PATH
+    )
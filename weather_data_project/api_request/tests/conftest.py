@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The ingestion scripts import each other by module name, as when run from api_request/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+import api_request
+
+def throttled(retry_after):
+    return SimpleNamespace(headers={"Retry-After": str(retry_after)})
+
+def test_retry_after_is_honoured_in_full():
+    assert api_request._backoff_delay(0, throttled(api_request.MAX_BACKOFF)) == api_request.MAX_BACKOFF
+
+def test_retry_after_beyond_the_cap_gives_up():
+    assert api_request._backoff_delay(0, throttled(api_request.MAX_BACKOFF + 1)) is None
+
+def test_fetch_gives_up_instead_of_retrying_early(monkeypatch):
+    monkeypatch.setenv("API_URL", "https://weather.invalid/current")
+    monkeypatch.setenv("RAPIDAPI_KEY", "key")
+    calls = []
+
+    class Throttled:
+        status_code = 429
+        headers = {"Retry-After": "3600"}
+
+        def raise_for_status(self):
+            raise api_request.requests.exceptions.HTTPError("429 Too Many Requests")
+
+    session = SimpleNamespace(get=lambda *args, **kwargs: calls.append(args) or Throttled())
+    monkeypatch.setattr(api_request.time, "sleep", lambda seconds: calls.append(("slept", seconds)))
+
+    data, stats = api_request.fetch_current_weather("Johannesburg", session=session, use_cache=False)
+
+    assert data is None
+    assert len(calls) == 1
+    assert stats["retries"] == 0
@@ -0,0 +1,103 @@
+import os
+import re
+import threading
+from datetime import date, datetime
+
+import backfill
+import locations
+from insert_data import normalize_reading
+from rate_limit import TokenBucket
+
+SOURCES_YML = os.path.join(os.path.dirname(__file__), "..", "..", "my_project", "models", "sources", "sources.yml")
+
+LONDON = {"results": [{"latitude": 51.5, "longitude": -0.13, "timezone": "Europe/London"}]}
+
+class FakePool:
+    def closeall(self):
+        pass
+
+    def putconn(self, conn, close=False):
+        pass
+
+def archive(times):
+    return {"hourly": {
+        "time": times,
+        "temperature_2m": [10.0 + i for i in range(len(times))],
+        "wind_speed_10m": [5.0] * len(times),
+        "weather_code": [3] * len(times)
+    }}
+
+def test_backfill_across_dst_fall_back_keeps_every_utc_hour(monkeypatch, tmp_path):
+    # Clocks go back at 01:00 UTC on 2024-10-27: 00:00 and 01:00 UTC are both 01:00 local
+    times = [f"2024-10-27T{hour:02d}:00" for hour in range(24)]
+    responses = {locations.DEFAULT_GEOCODING_URL: LONDON, backfill.DEFAULT_HISTORY_URL: archive(times)}
+    monkeypatch.setattr(locations, "_locations", locations.LocationCache(str(tmp_path / "locations.json")))
+    monkeypatch.setattr(backfill, "_get_json", lambda url, params, limiter, stop: responses[url])
+    monkeypatch.setattr(backfill, "get_healthy_connection", lambda pool: object())
+    monkeypatch.setattr(backfill, "existing_hours", lambda conn, city, start, end: set())
+    inserted = []
+
+    def fake_insert(conn, readings, chunk_size=None, changes=None):
+        inserted.extend(readings)
+        return len(readings)
+
+    monkeypatch.setattr(backfill, "insert_records_bulk", fake_insert)
+    source = backfill.HistorySource(TokenBucket(100), threading.Event())
+
+    backfill.run_chunk(FakePool(), source, ("London", date(2024, 10, 27), date(2024, 10, 27)), batch_size=100)
+
+    rows = [normalize_reading(reading) for reading in inserted]
+    assert len({(row["city"], row["time"]) for row in rows}) == len(times)
+    local = [datetime.fromisoformat(reading["timestamp"]).replace(tzinfo=None) for reading in inserted]
+    assert local[0] == local[1] == datetime(2024, 10, 27, 1)
+    assert [row["utc_offset"] for row in rows[:3]] == [3600, 0, 0]
+
+def test_backfilled_readings_match_live_labels_and_units(monkeypatch, tmp_path):
+    requests_made = []
+
+    def fake_get_json(url, params, limiter, stop):
+        requests_made.append((url, params))
+        return LONDON if url == locations.DEFAULT_GEOCODING_URL else archive(["2024-07-01T12:00"])
+
+    monkeypatch.setattr(backfill, "_get_json", fake_get_json)
+    monkeypatch.setattr(locations, "_locations", locations.LocationCache(str(tmp_path / "locations.json")))
+    source = backfill.HistorySource(TokenBucket(100), threading.Event())
+
+    readings = source.readings("London", date(2024, 7, 1), date(2024, 7, 1))
+
+    assert readings[0]["description"] == "Overcast clouds"
+    history_params = next(params for url, params in requests_made if url == backfill.DEFAULT_HISTORY_URL)
+    assert history_params["wind_speed_unit"] == "mph"
+    assert history_params["temperature_unit"] == "celsius"
+
+def test_chunk_with_hours_missing_from_the_archive_is_not_checkpointed(monkeypatch, tmp_path):
+    data = archive([f"2024-07-01T{hour:02d}:00" for hour in range(24)])
+    # The archive lags behind: the last hours of the day have no data yet
+    data["hourly"]["temperature_2m"][20:] = [None] * 4
+    responses = {locations.DEFAULT_GEOCODING_URL: LONDON, backfill.DEFAULT_HISTORY_URL: data}
+    monkeypatch.setattr(backfill, "_get_json", lambda url, params, limiter, stop: responses[url])
+    monkeypatch.setattr(locations, "_locations", locations.LocationCache(str(tmp_path / "locations.json")))
+    monkeypatch.setattr(backfill, "create_pool", lambda maxconn: FakePool())
+    monkeypatch.setattr(backfill, "get_healthy_connection", lambda pool: object())
+    monkeypatch.setattr(backfill, "create_table", lambda conn: None)
+    monkeypatch.setattr(backfill, "ensure_partitions", lambda conn, start, end, months_ahead: None)
+    monkeypatch.setattr(backfill, "existing_hours", lambda conn, city, start, end: set())
+    monkeypatch.setattr(backfill, "insert_records_bulk", lambda conn, readings, **kwargs: len(readings))
+    monkeypatch.setattr(backfill, "publish_changes", lambda *args: None)
+    monkeypatch.setattr(backfill, "record_run", lambda status, seconds: None)
+    checkpoint_path = str(tmp_path / "checkpoint.json")
+
+    inserted = backfill.backfill(["London"], date(2024, 7, 1), date(2024, 7, 1), workers=1,
+                                 checkpoint_path=checkpoint_path)
+
+    assert inserted == 20
+    assert not backfill.Checkpoint(checkpoint_path).is_done("London|2024-07-01|2024-07-01")
+
+def test_backfill_units_match_the_raw_source_docs():
+    with open(SOURCES_YML, encoding="utf-8") as f:
+        docs = f.read()
+    temperature = re.search(r"- name: temperature\s+description: Recorded temperature in (\w+)", docs).group(1)
+    wind_speed = re.search(r"- name: wind_speed\s+description: Speed of the wind in (\w+)", docs).group(1)
+
+    assert temperature.lower() == backfill.DEFAULT_TEMPERATURE_UNIT
+    assert wind_speed == backfill.DEFAULT_WIND_SPEED_UNIT
@@ -0,0 +1,67 @@
+from datetime import datetime, timezone
+
+import psycopg2
+
+import insert_data
+import locations
+
+ZONES = {"London": "Europe/London", "Johannesburg": "Africa/Johannesburg"}
+
+def test_fetch_readings_localizes_each_city_to_its_own_zone(monkeypatch, tmp_path):
+    fetched_at = datetime(2024, 7, 1, 12, tzinfo=timezone.utc).timestamp()
+    results = {
+        city: {"location": city, "temperature": 20, "description": "Clear sky", "wind_speed": 5, "fetched_at": fetched_at}
+        for city in ZONES
+    }
+    monkeypatch.setattr(insert_data, "get_current_weather_many", lambda cities, **kwargs: (dict(results), {}))
+    cache = locations.LocationCache(str(tmp_path / "locations.json"))
+    lookup = lambda url, params: {"results": [{"latitude": 0, "longitude": 0, "timezone": ZONES[params["name"]]}]}
+    for city in ZONES:
+        cache.locate(city, get_json=lookup)
+    monkeypatch.setattr(locations, "_locations", cache)
+
+    readings, failures = insert_data.fetch_readings(list(ZONES))
+
+    rows = {row["city"]: row for row in map(insert_data.normalize_reading, readings)}
+    assert not failures
+    assert rows["London"]["utc_offset"] == 3600
+    assert rows["Johannesburg"]["utc_offset"] == 7200
+    assert rows["London"]["time"] == rows["Johannesburg"]["time"]
+
+class OneCycle:
+    """Stands in for the daemon's stop event: lets n cycles run, then stops"""
+
+    def __init__(self, cycles=1):
+        self.cycles = cycles
+
+    def is_set(self):
+        return self.cycles <= 0
+
+    def wait(self, timeout=None):
+        self.cycles -= 1
+        return self.is_set()
+
+    def set(self):
+        self.cycles = 0
+
+def test_daemon_spools_readings_while_the_database_is_down(monkeypatch, tmp_path):
+    monkeypatch.setenv("SPOOL_PATH", str(tmp_path / "spool.jsonl"))
+    reading = insert_data.add_time_info(
+        {"location": "Johannesburg", "temperature": 20, "description": "Clear sky", "wind_speed": 5}
+    )
+    monkeypatch.setattr(insert_data, "fetch_due_readings", lambda cities, scheduler=None: ([reading], {}))
+    attempts = []
+
+    def database_down(maxconn=None):
+        attempts.append(maxconn)
+        raise psycopg2.OperationalError("connection refused")
+
+    monkeypatch.setattr(insert_data, "create_pool", database_down)
+    monkeypatch.setattr(insert_data, "record_run", lambda status, seconds: None)
+    monkeypatch.setattr(insert_data, "serve_from_env", lambda: None)
+    monkeypatch.setattr(insert_data.threading, "Event", lambda: OneCycle(cycles=2))
+
+    insert_data.run_daemon(["Johannesburg"], interval=1)
+
+    assert len(attempts) == 2
+    assert insert_data.spool.pending_count() == 2
@@ -0,0 +1,68 @@
+from datetime import date
+from types import SimpleNamespace
+
+import psycopg2
+
+import partitions
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        self.conn.statements.append(sql.strip())
+
+    def fetchall(self):
+        return [("raw_weather_data_2000_01",)]
+
+class FakeConn:
+    info = SimpleNamespace(host="db", port=5432, dbname="weather")
+
+    def __init__(self):
+        self.statements = []
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rollbacks += 1
+
+def test_routine_retention_runs_once_a_day(monkeypatch):
+    monkeypatch.setenv("RETENTION_MONTHS", "12")
+    monkeypatch.setattr(partitions, "_pruned_on", {})
+    conn = FakeConn()
+
+    assert partitions.drop_old_partitions(conn) == ["raw_weather_data_2000_01"]
+    assert partitions.drop_old_partitions(conn) == []
+    assert sum(statement.startswith("DROP TABLE") for statement in conn.statements) == 1
+
+def test_explicit_zero_keep_months_is_not_replaced_by_the_env(monkeypatch):
+    monkeypatch.setenv("RETENTION_MONTHS", "1200")
+    conn = FakeConn()
+
+    assert partitions.drop_old_partitions(conn, keep_months=0) == ["raw_weather_data_2000_01"]
+
+def test_partition_created_concurrently_by_another_process_is_retried(monkeypatch):
+    class RacingCursor(FakeCursor):
+        def execute(self, sql, params=None):
+            super().execute(sql, params)
+            if len(self.conn.statements) == 1:
+                raise psycopg2.errors.DuplicateTable("relation already exists")
+
+    conn = FakeConn()
+    monkeypatch.setattr(conn, "cursor", lambda: RacingCursor(conn), raising=False)
+
+    partitions.ensure_partitions(conn, date(2024, 1, 1), date(2024, 1, 1), months_ahead=0)
+
+    assert conn.rollbacks == 1
+    assert len(conn.statements) == 2
@@ -0,0 +1,78 @@
+"""
+Compare insert throughput (rows/sec) of the per-row insert_records path
+against the bulk COPY and execute_values paths.
+
+Uses the same DB_* environment variables as the ingestion job and writes
+into a temporary copy of dev.raw_weather_data, so no real data is touched.
+
+    python benchmarks/bench_insert.py --rows 20000 --per-row-rows 500
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from itertools import islice
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api_request"))
+
+from insert_data import connect_db, create_table, insert_records, insert_records_bulk  # noqa: E402
+from synthetic import generate_readings as synthetic_readings  # noqa: E402
+
+BENCH_TABLE = "bench_raw_weather_data"
+
+def generate_readings(n, cities=10, seed=42):
+    """Generate n hourly synthetic readings spread over the given number of cities"""
+    return islice(synthetic_readings(cities, hours=-(-n // cities), seed=seed), n)
+
+def _reset_table(conn):
+    with conn.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+        cursor.execute(f"CREATE TEMP TABLE {BENCH_TABLE} (LIKE dev.raw_weather_data INCLUDING ALL)")
+    conn.commit()
+
+def _time(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def run(rows, per_row_rows, chunk_size):
+    conn = connect_db()
+    results = {}
+    try:
+        create_table(conn)
+
+        _reset_table(conn)
+        readings = list(generate_readings(per_row_rows))
+        elapsed = _time(lambda: [insert_records(conn, data, table=BENCH_TABLE) for data in readings])
+        results["per_row"] = {"rows": per_row_rows, "seconds": elapsed, "rows_per_sec": per_row_rows / elapsed}
+
+        for method in ("values", "copy"):
+            _reset_table(conn)
+            elapsed = _time(lambda: insert_records_bulk(
+                conn, generate_readings(rows), chunk_size=chunk_size, method=method, table=BENCH_TABLE
+            ))
+            results[method] = {"rows": rows, "seconds": elapsed, "rows_per_sec": rows / elapsed}
+    finally:
+        conn.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000, help="rows to load with the bulk paths")
+    parser.add_argument("--per-row-rows", type=int, default=500, help="rows to load with insert_records")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--json", help="write the results to this file as JSON")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.per_row_rows, args.chunk_size)
+
+    print(f"\n{'method':<10}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for method, result in results.items():
+        print(f"{method:<10}{result['rows']:>10}{result['seconds']:>10.2f}{result['rows_per_sec']:>12.0f}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Benchmark the pipeline end to end on synthetic data.
+
+Seeds a local Postgres with N cities x M years of hourly readings (see
+synthetic.py), then times each stage:
+
+- seed:    loading the readings into dev.raw_weather_data with COPY
+- ingest:  insert_records and the bulk COPY / execute_values paths
+           (bench_insert.py, on a temporary table)
+- dbt:     every model, on a full refresh and on an incremental run after
+           one more day of readings
+- loaders: every dashboard load_* function, cold and cached, for a 30 day
+           window and the whole range, across all cities and for one city
+
+Uses the same DB_* environment variables as the ingestion job, plus
+DB_SCHEMA for the schema dbt builds the marts in. The database must be a
+local scratch database: seeding truncates dev.raw_weather_data. The dbt
+profile (my_project) must point at the same database; the raw source is
+declared in the postgres database, so use that one.
+
+    POSTGRES_SSLMODE=disable python benchmarks/run_benchmarks.py --cities 10 --years 1 --report bench.json
+    python benchmarks/run_benchmarks.py --stages loaders --report new.json --baseline bench.json
+
+The report is JSON: run metadata plus one result per stage and name with
+seconds, rows and rows/sec. With --baseline, results slower than the
+baseline by more than --threshold are listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.join(BENCH_DIR, "..")
+DBT_PROJECT_DIR = os.path.join(PROJECT_DIR, "my_project")
+sys.path.insert(0, os.path.join(PROJECT_DIR, "api_request"))
+sys.path.insert(0, os.path.join(PROJECT_DIR, "streamlit_app"))
+
+# Cold loader timings must come from the database, not from earlier snapshots
+os.environ["DASHBOARD_SNAPSHOTS"] = "false"
+
+import bench_insert  # noqa: E402
+from insert_data import (  # noqa: E402
+    RAW_TABLE, connect_db, create_table, get_db_connection_params, insert_records_bulk
+)
+from partitions import ensure_partitions  # noqa: E402
+from synthetic import DEFAULT_START, HOURS_PER_YEAR, generate_readings  # noqa: E402
+
+STAGES = ("seed", "ingest", "dbt", "loaders")
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+DEFAULT_THRESHOLD = 0.2
+INCREMENTAL_HOURS = 24
+LOADER_WINDOW_DAYS = 30
+
+# dbt model names, which are also the mart table names the dashboard reads
+TABLES = {
+    "descriptions": "weather_condition_frequency",
+    "hourly": "fct_hourly_weather_trend",
+    "daily": "fct_daily_weather_summary",
+    "weekly": "fct_weekly_weather_summary",
+    "monthly": "fct_monthly_weather_summary",
+    "profile": "fct_hourly_weather_profile"
+}
+
+def _result(stage, name, seconds, rows=None):
+    result = {"stage": stage, "name": name, "seconds": round(seconds, 4), "rows": rows}
+    if rows and seconds > 0:
+        result["rows_per_sec"] = round(rows / seconds, 1)
+    return result
+
+def _timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+def check_local(allow_remote):
+    host = get_db_connection_params()["host"] or ""
+    if host in LOCAL_HOSTS or host.startswith("/") or allow_remote:
+        return
+    raise SystemExit(f"Refusing to seed {host}: the benchmark truncates {RAW_TABLE}. "
+                     "Point DB_HOST at a local database or pass --allow-remote.")
+
+def seed(cities, hours, seed_value, chunk_size):
+    """Replace the raw data with the synthetic readings"""
+    end = DEFAULT_START + timedelta(hours=hours)
+    conn = connect_db()
+    try:
+        create_table(conn)
+        ensure_partitions(conn, DEFAULT_START.date(), (end + timedelta(hours=INCREMENTAL_HOURS)).date())
+        with conn.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {RAW_TABLE}")
+        conn.commit()
+        readings = generate_readings(cities, hours, seed_value)
+        inserted, seconds = _timed(lambda: insert_records_bulk(conn, readings, chunk_size=chunk_size))
+    finally:
+        conn.close()
+    return [_result("seed", "copy", seconds, inserted)]
+
+def ingest(rows, per_row_rows, chunk_size):
+    return [
+        _result("ingest", method, result["seconds"], result["rows"])
+        for method, result in bench_insert.run(rows, per_row_rows, chunk_size).items()
+    ]
+
+def run_dbt(phase, args, dbt_target=None):
+    """Run dbt and return one result per model from run_results.json"""
+    command = ["dbt", "run", "--project-dir", DBT_PROJECT_DIR] + args
+    if dbt_target:
+        command += ["--target", dbt_target]
+    completed, seconds = _timed(lambda: subprocess.run(command, cwd=DBT_PROJECT_DIR))
+    if completed.returncode != 0:
+        raise RuntimeError(f"dbt run ({phase}) failed with exit code {completed.returncode}")
+    with open(os.path.join(DBT_PROJECT_DIR, "target", "run_results.json"), encoding="utf-8") as f:
+        run_results = json.load(f)
+    results = [_result("dbt", f"{phase}.total", seconds)]
+    for model in run_results["results"]:
+        rows = (model.get("adapter_response") or {}).get("rows_affected")
+        results.append(_result("dbt", f"{phase}.{model['unique_id'].split('.')[-1]}",
+                               model["execution_time"], rows))
+    return results
+
+def dbt(cities, hours, seed_value, chunk_size, dbt_target=None):
+    """A full refresh, then an incremental run after one more day of readings"""
+    results = run_dbt("full_refresh", ["--full-refresh"], dbt_target)
+    conn = connect_db()
+    try:
+        start = DEFAULT_START + timedelta(hours=hours)
+        readings = generate_readings(cities, INCREMENTAL_HOURS, seed_value + 1, start=start)
+        insert_records_bulk(conn, readings, chunk_size=chunk_size)
+    finally:
+        conn.close()
+    return results + run_dbt("incremental", [], dbt_target)
+
+def create_engine_from_env():
+    from sqlalchemy import create_engine
+    params = get_db_connection_params()
+    url = f"postgresql://{params['user']}:{params['password']}@{params['host']}:{params['port']}/{params['dbname']}"
+    return create_engine(url, connect_args={"sslmode": params["sslmode"]})
+
+def loaders(schema):
+    """Time every dashboard loader cold (caches cleared) and cached"""
+    import loaders as dashboard
+
+    engine = create_engine_from_env()
+    cold = [dashboard.load_hourly_profile, dashboard.load_profile_rollup]
+
+    def clear():
+        dashboard.get_frame_cache().clear()
+        for loader in cold:
+            loader.clear()
+
+    bounds = dashboard.load_date_bounds(engine, TABLES["daily"], schema)
+    cities = dashboard.load_cities(engine, TABLES["daily"], schema)
+    if bounds is None or not cities:
+        raise RuntimeError(f"No dashboard data in {schema}; run the dbt stage first")
+    last_day = bounds[1] + timedelta(days=1)
+    windows = {"30d": (last_day - timedelta(days=LOADER_WINDOW_DAYS), last_day), "all": (bounds[0], last_day)}
+    calls = {
+        "load_cities": lambda start, end, city: dashboard.load_cities(engine, TABLES["daily"], schema),
+        "load_date_bounds": lambda start, end, city: dashboard.load_date_bounds(engine, TABLES["daily"], schema),
+        "load_weather_descriptions": lambda start, end, city: dashboard.load_weather_descriptions(
+            engine, TABLES["descriptions"], schema, city),
+        "load_hourly_data": lambda start, end, city: dashboard.load_hourly_data(
+            engine, TABLES["hourly"], schema, start, end, city),
+        "load_hourly_profile": lambda start, end, city: dashboard.load_hourly_profile(
+            engine, TABLES["hourly"], schema, start, end, city),
+        "load_daily_data": lambda start, end, city: dashboard.load_daily_data(
+            engine, TABLES["daily"], schema, start, end, city),
+        "load_summary_data.weekly": lambda start, end, city: dashboard.load_summary_data(
+            engine, "weekly", TABLES["weekly"], schema, "week", start, end, city),
+        "load_summary_data.monthly": lambda start, end, city: dashboard.load_summary_data(
+            engine, "monthly", TABLES["monthly"], schema, "month", start, end, city),
+        "load_profile_rollup": lambda start, end, city: dashboard.load_profile_rollup(
+            engine, TABLES["profile"], schema, start, end, city)
+    }
+
+    results = []
+    try:
+        for window, (start, end) in windows.items():
+            for city in (None, cities[0]):
+                scope = f"{window}.{'city' if city else 'all_cities'}"
+                for name, call in calls.items():
+                    clear()
+                    for cache in ("cold", "cached"):
+                        frame, seconds = _timed(lambda: call(start, end, city))
+                        # Loaders report errors in the page and return None
+                        if frame is None:
+                            raise RuntimeError(f"{name} returned no data for {scope}")
+                        results.append(_result("loaders", f"{name}.{scope}.{cache}", seconds, len(frame)))
+    finally:
+        engine.dispose()
+    return results
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCH_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results, baseline_path, threshold):
+    """Print the results that got slower than the baseline; returns how many did"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["stage"], r["name"]): r for r in json.load(f)["results"]}
+    regressions = 0
+    print(f"\n{'stage':<9}{'name':<55}{'baseline':>10}{'now':>10}{'change':>9}")
+    for result in results:
+        before = baseline.get((result["stage"], result["name"]))
+        if before is None or not before["seconds"]:
+            continue
+        change = result["seconds"] / before["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{result['stage']:<9}{result['name']:<55}{before['seconds']:>10.3f}"
+              f"{result['seconds']:>10.3f}{change:>+9.0%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cities", type=int, default=10, help="number of synthetic cities")
+    parser.add_argument("--years", type=float, default=1.0, help="years of hourly readings per city")
+    parser.add_argument("--seed", type=int, default=42, help="random seed for the synthetic readings")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"comma separated subset of {', '.join(STAGES)}")
+    parser.add_argument("--rows", type=int, default=20000, help="rows for the bulk insert paths in the ingest stage")
+    parser.add_argument("--per-row-rows", type=int, default=500, help="rows for insert_records in the ingest stage")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--schema", default=os.getenv("DB_SCHEMA") or "dev", help="schema dbt builds the marts in")
+    parser.add_argument("--dbt-target", help="dbt target to run (default: the profile's default)")
+    parser.add_argument("--allow-remote", action="store_true", help="allow seeding a non-local database")
+    parser.add_argument("--report", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="slowdown that counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        parser.error(f"unknown stages: {', '.join(sorted(unknown))}")
+    hours = int(args.years * HOURS_PER_YEAR)
+
+    results = []
+    if "seed" in stages:
+        check_local(args.allow_remote)
+        results += seed(args.cities, hours, args.seed, args.chunk_size)
+    if "ingest" in stages:
+        results += ingest(args.rows, args.per_row_rows, args.chunk_size)
+    if "dbt" in stages:
+        check_local(args.allow_remote)
+        results += dbt(args.cities, hours, args.seed, args.chunk_size, args.dbt_target)
+    if "loaders" in stages:
+        results += loaders(args.schema)
+
+    print(f"\n{'stage':<9}{'name':<55}{'rows':>10}{'seconds':>10}{'rows/sec':>12}")
+    for result in results:
+        rows = "" if result["rows"] is None else result["rows"]
+        rate = f"{result['rows_per_sec']:.0f}" if "rows_per_sec" in result else ""
+        print(f"{result['stage']:<9}{result['name']:<55}{rows:>10}{result['seconds']:>10.3f}{rate:>12}")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cities": args.cities,
+            "years": args.years,
+            "seed": args.seed,
+            "stages": stages,
+            "data_start": DEFAULT_START.isoformat()
+        },
+        "results": results
+    }
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.report}")
+    if args.baseline and compare(results, args.baseline, args.threshold):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Seeded synthetic weather readings for the benchmarks.
+
+Readings look like the API's (location, temperature, description,
+wind_speed, timestamp, utc_offset), one per city per hour, with a seasonal
+and daily temperature cycle so the marts aggregate realistic-looking data.
+The same arguments always produce the same readings.
+"""
+import math
+import random
+from datetime import datetime, timedelta, timezone
+
+HOURS_PER_YEAR = 365 * 24
+DEFAULT_START = datetime(2023, 1, 1, tzinfo=timezone.utc)
+# UTC offsets (hours) handed out to the synthetic cities in turn
+CITY_OFFSETS = [2, 0, 1, -5, 9, 5.5, -3, 10, -8, 3]
+DESCRIPTIONS = ["Sunny", "Partly cloudy", "Cloudy", "Overcast", "Light rain", "Thunderstorm", "Mist"]
+
+def city_names(count):
+    return [f"City {i:03d}" for i in range(count)]
+
+def _format_offset(offset):
+    sign = "-" if offset < 0 else "+"
+    minutes = int(abs(offset) * 60)
+    return f"{sign}{minutes // 60:02d}{minutes % 60:02d}"
+
+def _description(rng, temperature):
+    if temperature > 24:
+        return rng.choice(DESCRIPTIONS[:3])
+    if temperature < 8:
+        return rng.choice(DESCRIPTIONS[3:])
+    return rng.choice(DESCRIPTIONS)
+
+def generate_readings(cities=10, hours=HOURS_PER_YEAR, seed=42, start=DEFAULT_START):
+    """
+    Yield hours x cities readings in time order, starting at start (UTC).
+    Each city has its own UTC offset and base temperature.
+    """
+    rng = random.Random(seed)
+    names = city_names(cities)
+    zones = [timezone(timedelta(hours=CITY_OFFSETS[i % len(CITY_OFFSETS)])) for i in range(cities)]
+    base_temps = [rng.uniform(5, 25) for _ in range(cities)]
+    for hour in range(hours):
+        at = start + timedelta(hours=hour)
+        for name, zone, base_temp in zip(names, zones, base_temps):
+            local = at.astimezone(zone)
+            season = 8 * math.cos(2 * math.pi * (local.timetuple().tm_yday - 15) / 365)
+            daily = 5 * math.sin(2 * math.pi * (local.hour - 9) / 24)
+            temperature = round(base_temp + season + daily + rng.gauss(0, 1.5), 1)
+            yield {
+                "location": name,
+                "temperature": temperature,
+                "description": _description(rng, temperature),
+                "wind_speed": round(abs(rng.gauss(10, 4)), 1),
+                "timestamp": local.isoformat(),
+                "utc_offset": _format_offset(zone.utcoffset(None).total_seconds() / 3600)
+            }
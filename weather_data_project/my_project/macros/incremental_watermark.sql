@@ -0,0 +1,14 @@
+{#
+  High-water mark for incremental models: MAX(column) of the existing
+  relation, or the fallback when the relation doesn't have the column yet
+  (first run after the column was introduced), so the model backfills
+  itself instead of failing.
+#}
+{% macro incremental_watermark(column, fallback="'-infinity'::TIMESTAMP") %}
+  {%- set existing_columns = adapter.get_columns_in_relation(this) | map(attribute='name') | list -%}
+  {%- if column in existing_columns -%}
+    (SELECT COALESCE(MAX({{ column }}), {{ fallback }}) FROM {{ this }})
+  {%- else -%}
+    {{ fallback }}
+  {%- endif -%}
+{% endmacro %}
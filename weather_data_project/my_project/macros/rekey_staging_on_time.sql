@@ -0,0 +1,55 @@
+{#
+  Staging used to be keyed on (city, weather_time_local), which collides
+  when clocks go back. A deployed table without the time column is rekeyed
+  in place: each row takes the instant of the raw reading it was staged
+  from (same city, local time and time_inserted), the old unique index is
+  dropped and the new one added, next to a plain (city, weather_time_local)
+  index for the marts' range joins. Rows keep their staged_at, so incremental
+  marts such as weather_condition_frequency don't count them again. Rows
+  whose raw reading was already dropped by retention keep a NULL time.
+#}
+{% macro rekey_staging_on_time() %}
+  {%- if is_incremental() -%}
+    {%- set existing_columns = adapter.get_columns_in_relation(this) | map(attribute='name') | list -%}
+    {%- if 'time' not in existing_columns -%}
+      ALTER TABLE {{ this }} ADD COLUMN time TIMESTAMPTZ;
+      UPDATE {{ this }} AS staged
+      SET time = raw.time
+      FROM {{ source('dev', 'raw_weather_data') }} AS raw
+      WHERE raw.city = staged.city
+        AND raw.time_inserted = staged.inserted_at
+        AND (raw.time AT TIME ZONE 'UTC') + make_interval(secs => raw.utc_offset) = staged.weather_time_local;
+      DO $$
+      DECLARE
+          old_index TEXT;
+      BEGIN
+          FOR old_index IN
+              SELECT format('%I.%I', schemaname, indexname)
+              FROM pg_indexes
+              WHERE schemaname = '{{ this.schema }}'
+                AND tablename = '{{ this.identifier }}'
+                AND indexdef LIKE 'CREATE UNIQUE INDEX%weather_time_local%'
+          LOOP
+              EXECUTE 'DROP INDEX ' || old_index;
+          END LOOP;
+      END
+      $$;
+      CREATE UNIQUE INDEX ON {{ this }} (city, time);
+    {%- endif %}
+    -- dbt only creates configured indexes with the table, so an existing one
+    -- gets the marts' lookup index here unless it already has it
+    DO $$
+    BEGIN
+        IF NOT EXISTS (
+            SELECT 1
+            FROM pg_indexes
+            WHERE schemaname = '{{ this.schema }}'
+              AND tablename = '{{ this.identifier }}'
+              AND indexdef LIKE 'CREATE INDEX%(city, weather_time_local)'
+        ) THEN
+            CREATE INDEX ON {{ this }} (city, weather_time_local);
+        END IF;
+    END
+    $$;
+  {%- endif -%}
+{% endmacro %}
@@ -1,24 +1,52 @@
 {{
   config(
-    materialized = 'table'
+    materialized = 'incremental',
+    unique_key = ['city', 'date'],
+    incremental_strategy = 'delete+insert',
+    indexes = [
+      {'columns': ['city', 'date'], 'unique': True},
+      {'columns': ['date']}
+    ]
   )
 }}
 
+{% if is_incremental() %}
+-- Days that received new staging rows since the last run
+WITH touched_days AS (
+  SELECT DISTINCT
+    city,
+    date_trunc('day', weather_time_local) AS date
+  FROM {{ ref('staging') }}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+),
+
+weather AS (
+  SELECT s.*
+  FROM {{ ref('staging') }} AS s
+  JOIN touched_days AS t
+    ON s.city = t.city
+   AND s.weather_time_local >= t.date
+   AND s.weather_time_local < t.date + INTERVAL '1 day'
+),
+{% else %}
 WITH weather AS (
   SELECT *
   FROM {{ ref('staging') }}
 ),
+{% endif %}
 
 daily_summary AS (
   SELECT
+    city,
     date_trunc('day', weather_time_local) AS date,
     COUNT(*) AS observations,
     ROUND(AVG(temperature)::NUMERIC, 2) AS avg_temp,
     ROUND(MIN(temperature)::NUMERIC, 2) AS min_temp,
     ROUND(MAX(temperature)::NUMERIC, 2) AS max_temp,
-    ROUND(AVG(wind_speed::FLOAT)::NUMERIC, 2) AS avg_wind_speed
+    ROUND(AVG(wind_speed)::NUMERIC, 2) AS avg_wind_speed,
+    MAX(staged_at) AS last_staged_at
   FROM weather
-  GROUP BY date
+  GROUP BY city, date
 )
 
-SELECT * FROM daily_summary
\ No newline at end of file
+SELECT * FROM daily_summary
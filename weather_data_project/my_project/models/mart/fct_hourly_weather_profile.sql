@@ -0,0 +1,50 @@
+{{
+  config(
+    materialized = 'incremental',
+    unique_key = ['city', 'month', 'hour_of_day'],
+    incremental_strategy = 'delete+insert',
+    indexes = [
+      {'columns': ['city', 'month', 'hour_of_day'], 'unique': True},
+      {'columns': ['month']}
+    ]
+  )
+}}
+
+-- Average conditions by hour of day, per city and month. observations
+-- lets the dashboard combine months into a weighted profile for any range.
+
+{% if is_incremental() %}
+-- Months that received new staging rows since the last run
+WITH touched_months AS (
+  SELECT DISTINCT
+    city,
+    date_trunc('month', weather_time_local) AS month
+  FROM {{ ref('staging') }}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+),
+
+weather AS (
+  SELECT s.*
+  FROM {{ ref('staging') }} AS s
+  JOIN touched_months AS t
+    ON s.city = t.city
+   AND s.weather_time_local >= t.month
+   AND s.weather_time_local < t.month + INTERVAL '1 month'
+)
+{% else %}
+WITH weather AS (
+  SELECT *
+  FROM {{ ref('staging') }}
+)
+{% endif %}
+
+SELECT
+  city,
+  date_trunc('month', weather_time_local) AS month,
+  EXTRACT(HOUR FROM weather_time_local)::INTEGER AS hour_of_day,
+  COUNT(*) AS observations,
+  ROUND(AVG(temperature)::NUMERIC, 2) AS avg_temp,
+  ROUND(AVG(wind_speed)::NUMERIC, 2) AS avg_wind,
+  MAX(staged_at) AS last_staged_at
+FROM weather
+GROUP BY city, month, hour_of_day
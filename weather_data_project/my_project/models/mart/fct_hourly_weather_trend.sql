@@ -1,13 +1,45 @@
 {{
   config(
-    materialized = 'table'
+    materialized = 'incremental',
+    unique_key = ['city', 'hour'],
+    incremental_strategy = 'delete+insert',
+    indexes = [
+      {'columns': ['city', 'hour'], 'unique': True},
+      {'columns': ['hour']}
+    ]
   )
 }}
 
+{% if is_incremental() %}
+-- Hours that received new staging rows since the last run
+WITH touched_hours AS (
+  SELECT DISTINCT
+    city,
+    date_trunc('hour', weather_time_local) AS hour
+  FROM {{ ref('staging') }}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+),
+
+weather AS (
+  SELECT s.*
+  FROM {{ ref('staging') }} AS s
+  JOIN touched_hours AS t
+    ON s.city = t.city
+   AND s.weather_time_local >= t.hour
+   AND s.weather_time_local < t.hour + INTERVAL '1 hour'
+)
+{% else %}
+WITH weather AS (
+  SELECT *
+  FROM {{ ref('staging') }}
+)
+{% endif %}
+
 SELECT
+  city,
   date_trunc('hour', weather_time_local) AS hour,
   ROUND(AVG(temperature)::NUMERIC, 2) AS avg_temp,
-  ROUND(AVG(wind_speed::FLOAT)::NUMERIC, 2) AS avg_wind
-FROM {{ ref('staging') }}
-GROUP BY hour
-ORDER BY hour
\ No newline at end of file
+  ROUND(AVG(wind_speed)::NUMERIC, 2) AS avg_wind,
+  MAX(staged_at) AS last_staged_at
+FROM weather
+GROUP BY city, hour
@@ -0,0 +1,52 @@
+{{
+  config(
+    materialized = 'incremental',
+    unique_key = ['city', 'month'],
+    incremental_strategy = 'delete+insert',
+    indexes = [
+      {'columns': ['city', 'month'], 'unique': True},
+      {'columns': ['month']}
+    ]
+  )
+}}
+
+{% if is_incremental() %}
+-- Months that received new staging rows since the last run
+WITH touched_months AS (
+  SELECT DISTINCT
+    city,
+    date_trunc('month', weather_time_local) AS month
+  FROM {{ ref('staging') }}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+),
+
+weather AS (
+  SELECT s.*
+  FROM {{ ref('staging') }} AS s
+  JOIN touched_months AS t
+    ON s.city = t.city
+   AND s.weather_time_local >= t.month
+   AND s.weather_time_local < t.month + INTERVAL '1 month'
+),
+{% else %}
+WITH weather AS (
+  SELECT *
+  FROM {{ ref('staging') }}
+),
+{% endif %}
+
+monthly_summary AS (
+  SELECT
+    city,
+    date_trunc('month', weather_time_local) AS month,
+    COUNT(*) AS observations,
+    ROUND(AVG(temperature)::NUMERIC, 2) AS avg_temp,
+    ROUND(MIN(temperature)::NUMERIC, 2) AS min_temp,
+    ROUND(MAX(temperature)::NUMERIC, 2) AS max_temp,
+    ROUND(AVG(wind_speed)::NUMERIC, 2) AS avg_wind_speed,
+    MAX(staged_at) AS last_staged_at
+  FROM weather
+  GROUP BY city, month
+)
+
+SELECT * FROM monthly_summary
@@ -0,0 +1,52 @@
+{{
+  config(
+    materialized = 'incremental',
+    unique_key = ['city', 'week'],
+    incremental_strategy = 'delete+insert',
+    indexes = [
+      {'columns': ['city', 'week'], 'unique': True},
+      {'columns': ['week']}
+    ]
+  )
+}}
+
+{% if is_incremental() %}
+-- Weeks that received new staging rows since the last run
+WITH touched_weeks AS (
+  SELECT DISTINCT
+    city,
+    date_trunc('week', weather_time_local) AS week
+  FROM {{ ref('staging') }}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+),
+
+weather AS (
+  SELECT s.*
+  FROM {{ ref('staging') }} AS s
+  JOIN touched_weeks AS t
+    ON s.city = t.city
+   AND s.weather_time_local >= t.week
+   AND s.weather_time_local < t.week + INTERVAL '7 days'
+),
+{% else %}
+WITH weather AS (
+  SELECT *
+  FROM {{ ref('staging') }}
+),
+{% endif %}
+
+weekly_summary AS (
+  SELECT
+    city,
+    date_trunc('week', weather_time_local) AS week,
+    COUNT(*) AS observations,
+    ROUND(AVG(temperature)::NUMERIC, 2) AS avg_temp,
+    ROUND(MIN(temperature)::NUMERIC, 2) AS min_temp,
+    ROUND(MAX(temperature)::NUMERIC, 2) AS max_temp,
+    ROUND(AVG(wind_speed)::NUMERIC, 2) AS avg_wind_speed,
+    MAX(staged_at) AS last_staged_at
+  FROM weather
+  GROUP BY city, week
+)
+
+SELECT * FROM weekly_summary
@@ -1,10 +1,38 @@
 {{
-  config(materialized='table')
+  config(
+    materialized = 'incremental',
+    unique_key = ['city', 'weather_description'],
+    incremental_strategy = 'delete+insert'
+  )
 }}
 
+-- Counts are maintained additively: each run only counts newly staged
+-- rows and adds them to the stored totals
+WITH new_counts AS (
+  SELECT
+    city,
+    LOWER(weather_description) AS weather_description,
+    COUNT(*) AS frequency,
+    MAX(staged_at) AS last_staged_at
+  FROM {{ ref('staging') }}
+  {% if is_incremental() %}
+  WHERE staged_at > {{ incremental_watermark('last_staged_at', "'-infinity'::TIMESTAMPTZ") }}
+  {% endif %}
+  GROUP BY city, LOWER(weather_description)
+)
+
 SELECT
-  LOWER(weather_description) AS weather_description,
-  COUNT(*) AS frequency
-FROM {{ ref('staging') }}
-GROUP BY weather_description
-ORDER BY frequency DESC
\ No newline at end of file
+  n.city,
+  n.weather_description,
+  {% if is_incremental() %}
+  COALESCE(existing.frequency, 0) + n.frequency AS frequency,
+  {% else %}
+  n.frequency,
+  {% endif %}
+  n.last_staged_at
+FROM new_counts AS n
+{% if is_incremental() %}
+LEFT JOIN {{ this }} AS existing
+  ON existing.city = n.city
+ AND existing.weather_description = n.weather_description
+{% endif %}
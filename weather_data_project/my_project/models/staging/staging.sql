@@ -1,29 +1,62 @@
 {{
     config(
-        materialized = 'table',
-        unique_key = 'id'
+        materialized = 'incremental',
+        unique_key = ['city', 'time'],
+        incremental_strategy = 'delete+insert',
+        on_schema_change = 'append_new_columns',
+        indexes = [
+            {'columns': ['city', 'time'], 'unique': True},
+            -- Marts join back to staging on city and a local-time range
+            {'columns': ['city', 'weather_time_local']},
+            {'columns': ['inserted_at']},
+            {'columns': ['staged_at']}
+        ],
+        pre_hook = "{{ rekey_staging_on_time() }}"
     )
 }}
 
 WITH source AS(
 SELECT *
 FROM {{ source('dev', 'raw_weather_data')}}
+{% if is_incremental() %}
+-- Only rows that landed since the last run. The lookback re-reads a short
+-- overlap so rows from transactions that committed late are not skipped.
+WHERE time_inserted > {{ incremental_watermark('inserted_at', "'-infinity'::TIMESTAMPTZ") }}
+    - INTERVAL '{{ var("staging_lookback_hours", 3) }} hours'
+{% endif %}
 ),
 
-de_dup AS(
+-- Raw rows are unique per (city, time) since ingestion enforces it, so no
+-- dedup pass is needed here. Local time is not unique: when clocks go back,
+-- two UTC hours share a wall-clock hour, so rows are keyed on the instant.
+localized AS(
     SELECT
         *,
-        ROW_NUMBER() OVER(PARTITION BY time ORDER BY time_inserted) as rn
+        -- Local wall-clock time of the reading; utc_offset is stored in seconds
+        (time AT TIME ZONE 'UTC') + make_interval(secs => utc_offset) AS weather_time_local
     FROM source
 )
 
 
-SELECT 
+SELECT
     city,
     temperature,
     weather_description,
     wind_speed,
-    time AS weather_time_local,
-    (time_inserted + (utc_offset || 'hours')::interval) AS inserted_at_local
-FROM de_dup
-WHERE rn = 1
\ No newline at end of file
+    time,
+    weather_time_local,
+    (time_inserted AT TIME ZONE 'UTC') + make_interval(secs => utc_offset) AS inserted_at_local,
+    time_inserted AS inserted_at,
+    -- Marks the run that staged the row; marts pick up new rows by this
+    '{{ run_started_at }}'::TIMESTAMPTZ AS staged_at
+FROM localized
+{% if is_incremental() %}
+-- Readings from the lookback overlap that are already staged keep their
+-- original staged_at, so downstream marts never see them twice
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {{ this }} AS staged
+    WHERE staged.city = localized.city
+      AND staged.time = localized.time
+)
+{% endif %}
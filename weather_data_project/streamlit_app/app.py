@@ -6,12 +6,29 @@ from plotly.subplots import make_subplots
 import numpy as np
 import psycopg2
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from datetime import timedelta
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+from change_listener import DEFAULT_CHANNEL, ChangeListener
+from loaders import (
+    compact_frame, get_frame_cache, load_cities, load_daily_data, load_date_bounds, load_hourly_data,
+    load_hourly_profile, load_profile_rollup, load_summary_data, load_weather_descriptions, prepare_hourly,
+    take_load_stats
+)
+from downsample import downsample
+from profiler import DEFAULT_LOG_PATH, RerunProfiler
 import warnings
 
 
 warnings.filterwarnings('ignore')
 
+# Loaded frames are shared by every session, so they are never modified in
+# place; with Copy-on-Write, frames derived from them don't copy data either
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 # Load environment variables from .env file
 
 # Try to import statsmodels for trendlines (optional)
@@ -44,10 +61,29 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Refresh data button
-if st.sidebar.button("🔄 Refresh Data"):
-    st.cache_data.clear()
-    st.rerun()
+# Opt-in profiling of each rerun: DASHBOARD_PROFILE=true turns it on for every
+# session, ?profile=1 in the URL for one. Loaders, transforms, figure building
+# and chart rendering are timed, shown in the sidebar and appended to
+# DASHBOARD_PROFILE_LOG.
+PROFILE_ENABLED = (os.getenv('DASHBOARD_PROFILE', '').lower() in ('1', 'true', 'yes')
+                   or st.query_params.get('profile', '').lower() in ('1', 'true', 'yes'))
+PROFILE_LOG = os.getenv('DASHBOARD_PROFILE_LOG') or DEFAULT_LOG_PATH
+profiler = RerunProfiler(enabled=PROFILE_ENABLED, load_stats=take_load_stats)
+load_cities = profiler.wrap(load_cities, 'query')
+load_date_bounds = profiler.wrap(load_date_bounds, 'query')
+load_weather_descriptions = profiler.wrap(load_weather_descriptions, 'query')
+load_hourly_data = profiler.wrap(load_hourly_data, 'query')
+load_hourly_profile = profiler.wrap(load_hourly_profile, 'query')
+load_daily_data = profiler.wrap(load_daily_data, 'query')
+load_summary_data = profiler.wrap(load_summary_data, 'query')
+load_profile_rollup = profiler.wrap(load_profile_rollup, 'query')
+px = profiler.instrument(px, 'figure', label='px')
+go = profiler.instrument(go, 'figure', label='go')
+make_subplots = profiler.wrap(make_subplots, 'figure')
+st = profiler.instrument(st, 'render', names=('plotly_chart',), label='st')
+
+# Refresh data button; handled once the loaders are defined
+refresh_requested = st.sidebar.button("🔄 Refresh Data")
 
 # Database connection configuration
 st.sidebar.header("🔗 Database Connection")
@@ -98,7 +134,10 @@ def get_table_config():
     return {
         'descriptions': os.getenv('TABLE_WEATHER_DESCRIPTIONS', 'weather_condition_frequency'),
         'hourly': os.getenv('TABLE_HOURLY_TRENDS', 'fct_hourly_weather_trend'),
-        'daily': os.getenv('TABLE_DAILY_SUMMARY', 'fct_daily_weather_summary')
+        'daily': os.getenv('TABLE_DAILY_SUMMARY', 'fct_daily_weather_summary'),
+        'weekly': os.getenv('TABLE_WEEKLY_SUMMARY', 'fct_weekly_weather_summary'),
+        'monthly': os.getenv('TABLE_MONTHLY_SUMMARY', 'fct_monthly_weather_summary'),
+        'profile': os.getenv('TABLE_HOURLY_PROFILE', 'fct_hourly_weather_profile')
     }
 
 table_names = get_table_config()
@@ -108,6 +147,9 @@ with st.sidebar.expander("Table Configuration", expanded=False):
     st.write(f"**Weather Descriptions:** {table_names['descriptions']}")
     st.write(f"**Hourly Trends:** {table_names['hourly']}")
     st.write(f"**Daily Summary:** {table_names['daily']}")
+    st.write(f"**Weekly Summary:** {table_names['weekly']}")
+    st.write(f"**Monthly Summary:** {table_names['monthly']}")
+    st.write(f"**Hourly Profile:** {table_names['profile']}")
     
     # override_tables = st.checkbox("Override table names", value=False)
     # if override_tables:
@@ -131,7 +173,6 @@ def get_database_connection():
         
         # Test the connection
         with engine.connect() as conn:
-            from sqlalchemy import text
             result = conn.execute(text("SELECT 1"))
             result.fetchone()  # Consume the result
         
@@ -140,52 +181,119 @@ def get_database_connection():
         st.error(f"Database connection failed: {e}")
         return None
 
-# Data loading functions
-@st.cache_data
-def load_weather_descriptions(_engine, table_name, schema):
-    """Load weather descriptions from database"""
+# Dashboard settings
+ALL_CITIES = "All cities"
+DEFAULT_WINDOW_DAYS = 30
+# Long series are downsampled to about one point per pixel of chart width
+CHART_WIDTH = int(os.getenv('DASHBOARD_CHART_WIDTH') or 1400)
+DOWNSAMPLE_METHOD = os.getenv('DASHBOARD_DOWNSAMPLE') or 'lttb'
+ZOOM_STATE_KEY = 'zoom_window'
+
+# Rollup levels from finest to coarsest: (dataset, time column, bucket width)
+ROLLUP_LEVELS = [
+    ('hourly', 'hour', timedelta(hours=1)),
+    ('daily', 'date', timedelta(days=1)),
+    ('weekly', 'week', timedelta(weeks=1)),
+    ('monthly', 'month', timedelta(days=30))
+]
+ROLLUP_COLUMNS = {dataset: column for dataset, column, _ in ROLLUP_LEVELS}
+ROLLUP_LABELS = {'hourly': 'hourly', 'daily': 'daily averages', 'weekly': 'weekly averages', 'monthly': 'monthly averages'}
+# Below this many days the profile is computed from the hourly mart, so it
+# matches the window exactly instead of whole months
+PROFILE_ROLLUP_MIN_DAYS = 90
+
+def pick_rollup(start, end, max_points, finest='hourly'):
+    """
+    Choose the level to chart the window with: going from finest towards
+    coarsest, the first configured level whose buckets fit in max_points.
+    """
+    first = [level[0] for level in ROLLUP_LEVELS].index(finest)
+    levels = [level for level in ROLLUP_LEVELS[first:] if level[0] == finest or table_names[level[0]].strip()]
+    if start is None or end is None:
+        return levels[0]
+    for level in levels:
+        if (end - start) / level[2] <= max_points:
+            return level
+    return levels[-1]
+
+def load_rollup(dataset, start=None, end=None, city=None):
+    """Load a daily, weekly or monthly summary rollup for the current filters"""
     try:
-        query = f"""
-        SELECT weather_description, frequency 
-        FROM {schema}.{table_name} 
-        ORDER BY frequency DESC
-        """
-        return pd.read_sql(query, _engine)
+        return load_summary_data(engine, dataset, table_names[dataset], config['schema'],
+                                 ROLLUP_COLUMNS[dataset], start, end, city)
     except Exception as e:
-        st.error(f"Error loading weather descriptions: {e}")
+        st.error(f"Error loading {dataset} summary: {e}")
         return None
 
-@st.cache_data
-def load_hourly_data(_engine, table_name, schema):
-    """Load hourly weather data from database"""
-    try:
-        query = f"""
-        SELECT hour, avg_temp, avg_wind 
-        FROM {schema}.{table_name} 
-        ORDER BY hour
-        """
-        df = pd.read_sql(query, _engine)
-        df['hour'] = pd.to_datetime(df['hour'])
-        return df
-    except Exception as e:
-        st.error(f"Error loading hourly data: {e}")
-        return None
+# Change notifications from ingestion and dbt (see api_request/notifications.py)
+LISTEN_ENABLED = os.getenv('DASHBOARD_LISTEN', 'true').lower() not in ('0', 'false', 'no')
 
-@st.cache_data
-def load_daily_data(_engine, table_name, schema):
-    """Load daily weather summary from database"""
-    try:
-        query = f"""
-        SELECT date, observations, avg_temp, min_temp, max_temp, avg_wind_speed 
-        FROM {schema}.{table_name} 
-        ORDER BY date
-        """
-        df = pd.read_sql(query, _engine)
-        df['date'] = pd.to_datetime(df['date'])
-        return df
-    except Exception as e:
-        st.error(f"Error loading daily data: {e}")
-        return None
+def _as_date(value):
+    return pd.Timestamp(value).date() if value else None
+
+def invalidate_changed(change):
+    """Invalidate only the cached datasets, cities and windows a change notification covers"""
+    dataset_for_model = {table: key for key, table in table_names.items() if table.strip()}
+    models = change.get('models')
+    if models:
+        datasets = {dataset_for_model[model] for model in models if model in dataset_for_model}
+    else:
+        datasets = set(dataset_for_model.values())
+    if not datasets:
+        return
+    cities = set(change.get('cities') or [])
+    changed_start, changed_end = _as_date(change.get('start')), _as_date(change.get('end'))
+
+    def affected(key):
+        # Keys are (dataset, table, schema, [start, end,] city)
+        dataset, city = key[0], key[-1]
+        if dataset in ('cities', 'bounds'):
+            return 'daily' in datasets
+        if dataset not in datasets:
+            return False
+        if cities and city is not None and city not in cities:
+            return False
+        # Week and month buckets can start before the window, so only the
+        # hourly and daily frames are narrowed by date
+        if dataset in ('hourly', 'daily') and changed_start and changed_end:
+            window_start, window_end = key[3], key[4]
+            if window_end is not None and window_end <= changed_start:
+                return False
+            if window_start is not None and window_start > changed_end:
+                return False
+        return True
+
+    invalidated = get_frame_cache().invalidate(affected)
+    if 'hourly' in datasets:
+        load_hourly_profile.clear()
+    if 'profile' in datasets:
+        load_profile_rollup.clear()
+    print(f"Change from {change.get('source', 'unknown')}: invalidated {invalidated} cached frames")
+
+@st.cache_resource
+def get_change_listener():
+    """Start the shared LISTEN connection once per server process"""
+    def connect():
+        return psycopg2.connect(
+            host=config['host'],
+            port=config['port'],
+            dbname=config['database'],
+            user=config['username'],
+            password=config['password']
+        )
+    channel = os.getenv('NOTIFY_CHANNEL') or DEFAULT_CHANNEL
+    return ChangeListener(connect, invalidate_changed, channel=channel).start()
+
+def chart_series(df, x, y, width_fraction=1.0):
+    """Downsample one trace to the points the chart can actually show"""
+    return downsample(df, x, y, int(CHART_WIDTH * width_fraction), DOWNSAMPLE_METHOD)
+
+def hourly_profile(df):
+    """Hour-of-day averages of an already loaded hourly frame (sample mode)"""
+    return df.groupby('hour_of_day').agg({
+        'avg_temp': 'mean',
+        'avg_wind': 'mean'
+    }).reset_index()
 
 # Create sample data function for demo
 @st.cache_data
@@ -200,7 +308,7 @@ def create_sample_data():
         'frequency': [1250, 980, 750, 620, 450, 380, 180, 95, 120, 80, 200, 150, 300]
     })
     
-    hours = pd.date_range('2024-01-01', periods=24*7, freq='H')
+    hours = pd.date_range('2024-01-01', periods=24*7, freq='h')
     np.random.seed(42)
     base_temp = 15 + 10 * np.sin(np.arange(len(hours)) * 2 * np.pi / 24)
     noise = np.random.normal(0, 2, len(hours))
@@ -220,7 +328,94 @@ def create_sample_data():
         'avg_wind_speed': np.round(np.random.uniform(8, 20, len(dates)), 2)
     })
     
-    return descriptions, hourly, daily
+    return compact_frame(descriptions), prepare_hourly(hourly), compact_frame(daily)
+
+def select_window(bounds):
+    """Sidebar date range control; returns a half-open [start, end) window"""
+    first, last = bounds
+    default_start = max(first, last - timedelta(days=DEFAULT_WINDOW_DAYS - 1))
+    # Keyed on the bounds so the default follows newly loaded days
+    key = f"date_window_{first}_{last}"
+    zoom = st.session_state.pop(ZOOM_STATE_KEY, None)
+    if zoom is not None:
+        st.session_state[key] = tuple(min(max(day, first), last) for day in zoom)
+    default = {} if key in st.session_state else {'value': (default_start, last)}
+    picked = st.sidebar.date_input("Date range:", min_value=first, max_value=last, key=key, **default)
+    if not isinstance(picked, (tuple, list)):
+        picked = (picked,)
+    # Only the start date is set while a range is still being picked
+    start = picked[0] if picked else default_start
+    end = picked[1] if len(picked) > 1 else start
+    return start, end + timedelta(days=1)
+
+def zoomable_chart(fig, key):
+    """
+    Render a time-series chart where dragging a box across it zooms in: the
+    selected days become the date window, so the data is re-queried and
+    drawn at a finer resolution.
+    """
+    fig.update_layout(dragmode='select', selectdirection='h')
+    event = st.plotly_chart(fig, use_container_width=True, on_select="rerun",
+                            selection_mode="box", key=key)
+    boxes = event.selection.get('box', []) if event else []
+    if boxes and len(boxes[0].get('x', [])) >= 2:
+        selected = tuple(boxes[0]['x'][:2])
+        # The selection survives reruns; only act on a new one
+        if st.session_state.get(f"{key}_applied") != selected:
+            st.session_state[f"{key}_applied"] = selected
+            low, high = sorted(pd.Timestamp(value) for value in selected)
+            st.session_state[ZOOM_STATE_KEY] = (low.date(), high.date())
+            st.rerun()
+    st.caption("Drag across the chart to zoom in; the date range in the sidebar widens it again.")
+
+def filter_window(df, column, start, end):
+    """Rows of an in-memory frame inside [start, end) (sample mode)"""
+    mask = (df[column] >= pd.Timestamp(start)) & (df[column] < pd.Timestamp(end))
+    return df[mask].reset_index(drop=True)
+
+chart_series = profiler.wrap(chart_series, 'transform')
+hourly_profile = profiler.wrap(hourly_profile, 'transform')
+filter_window = profiler.wrap(filter_window, 'transform')
+
+# Datasets used by each page, in the order their loads are started
+PAGE_DATASETS = {
+    "🏠 Overview": ['descriptions', 'hourly', 'daily'],
+    "☁️ Weather Descriptions": ['descriptions'],
+    "⏰ Hourly Trends": ['hourly'],
+    "📅 Daily Summaries": ['daily'],
+    "🔄 Multi-View Analysis": ['descriptions', 'hourly', 'daily']
+}
+
+def load_dataset(key):
+    """Load one dataset for the current filters"""
+    table_name = table_names[key]
+    if key == 'descriptions':
+        return load_weather_descriptions(engine, table_name, config['schema'], city)
+    if key == 'hourly':
+        return load_hourly_data(engine, table_name, config['schema'], start, end, city)
+    return load_daily_data(engine, table_name, config['schema'], start, end, city)
+
+def load_datasets(keys):
+    """
+    Start loading the given datasets concurrently and return a future per key.
+    The loads share the engine's connection pool. Each worker thread gets the
+    script run context, so st.error inside a loader still renders.
+    """
+    ctx = get_script_run_ctx()
+
+    def run(key):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return load_dataset(key)
+
+    with ThreadPoolExecutor(max_workers=max(1, len(keys))) as executor:
+        return {key: executor.submit(run, key) for key in keys}
+
+# Refreshing catches the cached frames up instead of reloading them; only
+# the hour-of-day profiles, which live in st.cache_data, are dropped
+if refresh_requested:
+    get_frame_cache().refresh_all()
+    load_hourly_profile.clear()
+    load_profile_rollup.clear()
 
 # Main title
 st.title("🌤️ Johannesburg Weather Analytics Dashboard")
@@ -240,54 +435,89 @@ if missing_vars:
 # Connection status and data loading
 use_sample_data = st.sidebar.checkbox("Use Sample Data (Demo Mode)", value=bool(missing_vars))
 
+# Navigation
+st.sidebar.markdown("---")
+st.sidebar.title("📊 Dashboard Navigation")
+page = st.sidebar.selectbox(
+    "Select Analysis View:",
+    list(PAGE_DATASETS)
+)
+# Only the datasets the selected page uses are loaded
+needed = [key for key in PAGE_DATASETS[page] if table_names[key].strip()]
+
+# Filters are applied before loading, so only the selected window is fetched
+start, end, city = None, None, None
+
 if use_sample_data:
     st.sidebar.success("Using sample data for demonstration")
     sample_desc, sample_hourly, sample_daily = create_sample_data()
-    data = {
-        'descriptions': sample_desc,
-        'hourly': sample_hourly,
-        'daily': sample_daily
+
+    st.sidebar.markdown("---")
+    st.sidebar.subheader("🔎 Filters")
+    st.sidebar.caption("Sample data covers a single city")
+    start, end = select_window((sample_daily['date'].min().date(), sample_daily['date'].max().date()))
+    sample = {
+        'descriptions': lambda: sample_desc,
+        'hourly': lambda: filter_window(sample_hourly, 'hour', start, end),
+        'daily': lambda: filter_window(sample_daily, 'date', start, end)
     }
+    data = {key: sample[key]() for key in needed}
 else:
     # Try to connect to database
     engine = get_database_connection()
     
     if engine is not None:
         st.sidebar.success("✅ Database connected successfully!")
+        listener = get_change_listener() if LISTEN_ENABLED else None
+
+        st.sidebar.markdown("---")
+        st.sidebar.subheader("🔎 Filters")
+        if table_names['daily'].strip():
+            cities = load_cities(engine, table_names['daily'], config['schema'])
+            selected_city = st.sidebar.selectbox("City:", [ALL_CITIES] + cities)
+            city = None if selected_city == ALL_CITIES else selected_city
+
+            bounds = load_date_bounds(engine, table_names['daily'], config['schema'])
+            if bounds is not None:
+                start, end = select_window(bounds)
         
         # Load data from database
         data = {}
         
         with st.spinner("Loading data from database..."):
-            # Check which tables exist and load data
-            for key, table_name in table_names.items():
-                if table_name.strip():  # Only if table name is provided
-                    try:
-                        if key == 'descriptions':
-                            data[key] = load_weather_descriptions(engine, table_name, config['schema'])
-                        elif key == 'hourly':
-                            data[key] = load_hourly_data(engine, table_name, config['schema'])
-                        elif key == 'daily':
-                            data[key] = load_daily_data(engine, table_name, config['schema'])
-                        
-                        if data[key] is not None and len(data[key]) > 0:
-                            st.sidebar.success(f"✅ {key.title()} data loaded: {len(data[key])} records")
-                        else:
-                            st.sidebar.warning(f"⚠️ {key.title()} table empty or not found")
-                    except Exception as e:
-                        st.sidebar.error(f"❌ Error loading {key}: {str(e)}")
+            futures = load_datasets(needed)
+            for key, future in futures.items():
+                try:
+                    data[key] = future.result()
+                    
+                    if data[key] is not None and len(data[key]) > 0:
+                        st.sidebar.success(f"✅ {key.title()} data loaded: {len(data[key])} records")
+                    else:
+                        st.sidebar.warning(f"⚠️ {key.title()} table empty or not found")
+                except Exception as e:
+                    st.sidebar.error(f"❌ Error loading {key}: {str(e)}")
     else:
         st.sidebar.error("❌ Database connection failed")
         st.warning("Please check your .env file configuration or enable 'Use Sample Data' to see the dashboard.")
         st.stop()
 
-# Navigation
-st.sidebar.markdown("---")
-st.sidebar.title("📊 Dashboard Navigation")
-page = st.sidebar.selectbox(
-    "Select Analysis View:",
-    ["🏠 Overview", "☁️ Weather Descriptions", "⏰ Hourly Trends", "📅 Daily Summaries", "🔄 Multi-View Analysis"]
-)
+def get_hourly_profile():
+    """Hour-of-day averages for the current filters, aggregated in the database when connected"""
+    if use_sample_data:
+        return hourly_profile(data['hourly'])
+    long_window = start is not None and end is not None and (end - start).days >= PROFILE_ROLLUP_MIN_DAYS
+    if long_window and table_names['profile'].strip():
+        return load_profile_rollup(engine, table_names['profile'], config['schema'], start, end, city)
+    return load_hourly_profile(engine, table_names['hourly'], config['schema'], start, end, city)
+
+def get_time_series(finest):
+    """
+    The loaded frame, or a coarser rollup when the window has more buckets
+    than the chart can show. Returns (frame, time column, level label).
+    """
+    dataset = finest if use_sample_data else pick_rollup(start, end, CHART_WIDTH, finest)[0]
+    frame = data[dataset] if dataset in data else load_rollup(dataset, start, end, city)
+    return frame, ROLLUP_COLUMNS[dataset], ROLLUP_LABELS[dataset]
 
 
 # Overview Page
@@ -314,6 +544,9 @@ DB_SCHEMA={config['schema']}
 TABLE_WEATHER_DESCRIPTIONS={table_names['descriptions']}
 TABLE_HOURLY_TRENDS={table_names['hourly']}
 TABLE_DAILY_SUMMARY={table_names['daily']}
+TABLE_WEEKLY_SUMMARY={table_names['weekly']}
+TABLE_MONTHLY_SUMMARY={table_names['monthly']}
+TABLE_HOURLY_PROFILE={table_names['profile']}
             """, language="bash")
     
     col1, col2, col3 = st.columns(3)
@@ -444,10 +677,6 @@ elif page == "⏰ Hourly Trends":
     df = data['hourly']
     st.header("⏰ Hourly Weather Trends")
     
-    # Add hour of day for better analysis
-    df['hour_of_day'] = df['hour'].dt.hour
-    df['date'] = df['hour'].dt.date
-    
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -464,21 +693,22 @@ elif page == "⏰ Hourly Trends":
                                 ["Time Series", "Hourly Patterns", "Temperature vs Wind", "Correlation Analysis"])
     
     if analysis_type == "Time Series":
+        series, time_column, level = get_time_series('hourly')
+        wind_column = 'avg_wind' if 'avg_wind' in series else 'avg_wind_speed'
         fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
                            subplot_titles=('Temperature Over Time', 'Wind Speed Over Time'))
-        fig.add_trace(go.Scatter(x=df['hour'], y=df['avg_temp'], name='Temperature',
+        temp = chart_series(series, time_column, 'avg_temp')
+        wind = chart_series(series, time_column, wind_column)
+        fig.add_trace(go.Scatter(x=temp[time_column], y=temp['avg_temp'], name='Temperature',
                                 line=dict(color='red')), row=1, col=1)
-        fig.add_trace(go.Scatter(x=df['hour'], y=df['avg_wind'], name='Wind Speed',
+        fig.add_trace(go.Scatter(x=wind[time_column], y=wind[wind_column], name='Wind Speed',
                                 line=dict(color='blue')), row=2, col=1)
         fig.update_yaxes(title_text="Temperature (°C)", row=1, col=1)
         fig.update_yaxes(title_text="Wind Speed (m/s)", row=2, col=1)
-        fig.update_layout(height=600, title_text="Hourly Weather Trends Over Time")
+        fig.update_layout(height=600, title_text=f"Weather Trends Over Time ({level})")
     
     elif analysis_type == "Hourly Patterns":
-        hourly_avg = df.groupby('hour_of_day').agg({
-            'avg_temp': 'mean',
-            'avg_wind': 'mean'
-        }).reset_index()
+        hourly_avg = get_hourly_profile()
         
         fig = make_subplots(rows=1, cols=2, subplot_titles=('Average Temperature by Hour', 'Average Wind Speed by Hour'))
         fig.add_trace(go.Bar(x=hourly_avg['hour_of_day'], y=hourly_avg['avg_temp'],
@@ -507,7 +737,10 @@ elif page == "⏰ Hourly Trends":
                             labels={'avg_temp': 'Temperature (°C)', 'avg_wind': 'Wind Speed (m/s)'})
             st.info("💡 Install 'statsmodels' package to see trendlines: `pip install statsmodels`")
     
-    st.plotly_chart(fig, use_container_width=True)
+    if analysis_type == "Time Series":
+        zoomable_chart(fig, "hourly_time_series")
+    else:
+        st.plotly_chart(fig, use_container_width=True)
 
 # Daily Summaries Page
 elif page == "📅 Daily Summaries":
@@ -533,26 +766,30 @@ elif page == "📅 Daily Summaries":
     chart_type = st.selectbox("Visualization:", 
                              ["Temperature Trends", "Temperature Range", "Wind Analysis", "Observations Count"])
     
+    if chart_type in ("Temperature Trends", "Temperature Range"):
+        series, time_column, level = get_time_series('daily')
+        avg, low, high = (chart_series(series, time_column, column) for column in ('avg_temp', 'min_temp', 'max_temp'))
+
     if chart_type == "Temperature Trends":
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df['date'], y=df['avg_temp'], name='Avg Temperature',
+        fig.add_trace(go.Scatter(x=avg[time_column], y=avg['avg_temp'], name='Avg Temperature',
                                 line=dict(color='orange', width=3)))
-        fig.add_trace(go.Scatter(x=df['date'], y=df['min_temp'], name='Min Temperature',
+        fig.add_trace(go.Scatter(x=low[time_column], y=low['min_temp'], name='Min Temperature',
                                 line=dict(color='blue', dash='dot')))
-        fig.add_trace(go.Scatter(x=df['date'], y=df['max_temp'], name='Max Temperature',
+        fig.add_trace(go.Scatter(x=high[time_column], y=high['max_temp'], name='Max Temperature',
                                 line=dict(color='red', dash='dot')))
-        fig.update_layout(title="Daily Temperature Trends", yaxis_title="Temperature (°C)")
+        fig.update_layout(title=f"Temperature Trends ({level})", yaxis_title="Temperature (°C)")
     
     elif chart_type == "Temperature Range":
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df['date'], y=df['max_temp'], fill=None, mode='lines',
+        fig.add_trace(go.Scatter(x=high[time_column], y=high['max_temp'], fill=None, mode='lines',
                                 line_color='rgba(255,0,0,0)', showlegend=False))
-        fig.add_trace(go.Scatter(x=df['date'], y=df['min_temp'], fill='tonexty', mode='lines',
+        fig.add_trace(go.Scatter(x=low[time_column], y=low['min_temp'], fill='tonexty', mode='lines',
                                 line_color='rgba(255,0,0,0)', name='Temperature Range',
                                 fillcolor='rgba(255,0,0,0.2)'))
-        fig.add_trace(go.Scatter(x=df['date'], y=df['avg_temp'], mode='lines',
+        fig.add_trace(go.Scatter(x=avg[time_column], y=avg['avg_temp'], mode='lines',
                                 line=dict(color='orange', width=3), name='Average'))
-        fig.update_layout(title="Daily Temperature Range", yaxis_title="Temperature (°C)")
+        fig.update_layout(title=f"Temperature Range ({level})", yaxis_title="Temperature (°C)")
     
     elif chart_type == "Wind Analysis":
         fig = px.bar(df, x='date', y='avg_wind_speed',
@@ -566,7 +803,10 @@ elif page == "📅 Daily Summaries":
                     color_continuous_scale='Greens')
         fig.update_layout(yaxis_title="Number of Observations")
     
-    st.plotly_chart(fig, use_container_width=True)
+    if chart_type in ("Temperature Trends", "Temperature Range"):
+        zoomable_chart(fig, "daily_temperature")
+    else:
+        st.plotly_chart(fig, use_container_width=True)
 
 # Multi-View Analysis Page
 elif page == "🔄 Multi-View Analysis":
@@ -614,8 +854,8 @@ elif page == "🔄 Multi-View Analysis":
                              names='weather_description', title="Top 5 Weather Conditions")
                 st.plotly_chart(fig1, use_container_width=True)
             elif 'hourly' in available_data:
-                hourly_avg = data['hourly'].groupby(data['hourly']['hour'].dt.hour)['avg_temp'].mean()
-                fig1 = px.line(x=hourly_avg.index, y=hourly_avg.values,
+                hourly_avg = get_hourly_profile()
+                fig1 = px.line(x=hourly_avg['hour_of_day'], y=hourly_avg['avg_temp'],
                               title="Average Temperature by Hour of Day")
                 fig1.update_xaxes(title="Hour of Day")
                 fig1.update_yaxes(title="Temperature (°C)")
@@ -623,7 +863,7 @@ elif page == "🔄 Multi-View Analysis":
         
         with col2:
             if 'daily' in available_data:
-                fig2 = px.line(data['daily'], x='date', y='avg_temp',
+                fig2 = px.line(chart_series(data['daily'], 'date', 'avg_temp', width_fraction=0.5), x='date', y='avg_temp',
                               title="Daily Temperature Trend")
                 st.plotly_chart(fig2, use_container_width=True)
             elif 'hourly' in available_data:
@@ -640,5 +880,25 @@ st.sidebar.markdown(f"""
 - Database: {config['database']}
 - Schema: {config['schema']}
 - Connection: {'✅ Active' if 'engine' in locals() and engine is not None else '❌ Inactive'}
+- Live updates: {'✅ Listening' if 'listener' in locals() and listener is not None and listener.connected else '❌ Off'}
 """)
 st.sidebar.markdown("*Using secure environment variable configuration*")
+
+if profiler.enabled:
+    summary = profiler.summary()
+    with st.sidebar.expander("⏱️ Performance", expanded=True):
+        st.metric("Rerun time", f"{summary['rerun_seconds'] * 1000:.0f} ms")
+        st.caption(f"Cache: {summary['cache_hits']} served from cache, {summary['cache_misses']} waited on the database")
+        st.dataframe(pd.DataFrame([
+            {'kind': kind, 'calls': total['calls'], 'ms': round(total['seconds'] * 1000, 1)}
+            for kind, total in summary['kinds'].items()
+        ]), use_container_width=True, hide_index=True)
+        if profiler.records:
+            calls = pd.DataFrame(profiler.records).assign(ms=lambda df: (df['seconds'] * 1000).round(1))
+            if 'query_seconds' in calls:
+                calls['db_ms'] = (calls['query_seconds'] * 1000).round(1)
+            st.dataframe(calls.drop(columns=['seconds', 'query_seconds'], errors='ignore'),
+                         use_container_width=True, hide_index=True)
+    ctx = get_script_run_ctx()
+    profiler.export(PROFILE_LOG, session=ctx.session_id if ctx else None, page=page,
+                    sample_data=use_sample_data, city=city, start=start, end=end)
@@ -0,0 +1,83 @@
+import json
+import select
+import threading
+
+import psycopg2
+from psycopg2 import sql
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+DEFAULT_CHANNEL = "weather_data_changed"
+POLL_SECONDS = 5
+MAX_RECONNECT_DELAY = 60
+
+class ChangeListener:
+    """
+    LISTENs for change notifications from ingestion and dbt on a single
+    connection and passes each decoded payload to on_change.
+
+    The connection runs on a daemon thread and reconnects with backoff.
+    Notifications sent while it was down are lost, so after a reconnect
+    on_change gets an empty payload, which means "anything may have changed".
+    """
+
+    def __init__(self, connect, on_change, channel=DEFAULT_CHANNEL):
+        self.connect = connect
+        self.on_change = on_change
+        self.channel = channel
+        self.connected = False
+        self.received = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="change-listener", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _dispatch(self, payload):
+        try:
+            self.on_change(payload)
+        except Exception as e:
+            print(f"Change handler failed for {payload}: {e}")
+
+    def _run(self):
+        delay = 1
+        first = True
+        while not self._stop.is_set():
+            conn = None
+            try:
+                conn = self.connect()
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cursor:
+                    cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(self.channel)))
+                self.connected = True
+                delay = 1
+                print(f"Listening for changes on {self.channel}")
+                if not first:
+                    self._dispatch({})
+                first = False
+
+                while not self._stop.is_set():
+                    if select.select([conn], [], [], POLL_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            payload = json.loads(notify.payload)
+                        except ValueError:
+                            payload = {}
+                        self.received += 1
+                        self._dispatch(payload)
+            except psycopg2.Error as e:
+                print(f"Change listener connection lost: {e}")
+            finally:
+                self.connected = False
+                if conn is not None:
+                    conn.close()
+            self._stop.wait(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
@@ -0,0 +1,81 @@
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+def _numeric(values):
+    """Float view of x values; datetimes become nanoseconds since the first one"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        values = values.astype("datetime64[ns]").astype(np.int64)
+        return (values - values[0]).astype(np.float64)
+    return values.astype(np.float64)
+
+def minmax_indices(y, n_out):
+    """
+    Indices of the minimum and maximum of each bucket, in order.
+    The series is split into n_out // 2 equal-count buckets, so peaks and
+    dips survive and the output has at most n_out points (plus the ends).
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    buckets = max(1, n_out // 2)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    bucket_ids = np.repeat(np.arange(buckets), np.diff(edges))
+    # Sorted by bucket, then by value: each bucket's first and last entries
+    # are its minimum and maximum
+    order = np.lexsort((y, bucket_ids))
+    lows = order[edges[:-1]]
+    highs = order[edges[1:] - 1]
+    return np.unique(np.concatenate([lows, highs, [0, n - 1]]))
+
+def lttb_indices(x, y, n_out):
+    """
+    Indices picked by Largest-Triangle-Three-Buckets.
+    Bucket means come from cumulative sums and the triangle areas of each
+    bucket are computed in one NumPy expression; only the walk from bucket
+    to bucket is a Python loop, since each pick depends on the previous one.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+    x = _numeric(x)
+
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sum_x = np.concatenate([[0.0], np.cumsum(x)])
+    sum_y = np.concatenate([[0.0], np.cumsum(y)])
+    mean_x = (sum_x[ends] - sum_x[starts]) / (ends - starts)
+    mean_y = (sum_y[ends] - sum_y[starts]) / (ends - starts)
+    # Each bucket is scored against the mean of the bucket after it
+    next_x = np.append(mean_x[1:], x[-1])
+    next_y = np.append(mean_y[1:], y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    previous = 0
+    for i, (start, end) in enumerate(zip(starts, ends)):
+        px, py = x[previous], y[previous]
+        areas = np.abs((px - next_x[i]) * (y[start:end] - py) - (px - x[start:end]) * (next_y[i] - py))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    return selected
+
+def downsample(df, x, y, n_out, method="lttb"):
+    """
+    Rows of df[[x, y]] that draw y against x with about n_out points.
+    Rows with a missing y are dropped first; short series come back whole.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method: {method}")
+    series = df[[x, y]].dropna(subset=[y])
+    if len(series) <= n_out:
+        return series
+    if method == "lttb":
+        indices = lttb_indices(series[x].to_numpy(), series[y].to_numpy(), n_out)
+    else:
+        indices = minmax_indices(series[y].to_numpy(), n_out)
+    return series.iloc[indices]
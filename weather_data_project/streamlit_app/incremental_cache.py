@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 32
+WATERMARK_COLUMN = "last_staged_at"
+
+class IncrementalCache:
+    """
+    TTL cache of mart query results that refreshes incrementally.
+
+    Each entry remembers the newest last_staged_at it has seen. Once the TTL
+    has passed, only rows staged after that watermark are fetched, and they
+    replace the cached rows with the same merge key (an hour, date or
+    description the marts recomputed). Stale entries are served while a
+    background thread catches them up, so a rerun never waits on the refresh.
+    invalidate() starts the same catch-up early when a change is announced.
+
+    With a snapshot store, every fetched or refreshed frame is also written
+    to disk. A key missing from memory is then served from its snapshot and
+    caught up in the background, instead of being fetched in full.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, background=True, snapshots=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.background = background
+        self.snapshots = snapshots
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._outcome = threading.local()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @staticmethod
+    def _watermark(frame):
+        if WATERMARK_COLUMN not in frame or frame.empty:
+            return None
+        watermark = frame[WATERMARK_COLUMN].max()
+        return None if pd.isna(watermark) else watermark
+
+    @classmethod
+    def _split(cls, frame, prepare):
+        """Separate the watermark from a fetched frame and prepare the frame for callers"""
+        watermark = cls._watermark(frame)
+        frame = frame.drop(columns=[WATERMARK_COLUMN], errors="ignore")
+        return (prepare(frame) if prepare else frame), watermark
+
+    def _served(self, outcome, frame):
+        self._outcome.value = outcome
+        return frame
+
+    def take_outcome(self):
+        """
+        How the last get() in this thread was served, then forget it: hit,
+        stale (refreshing in the background), refresh (caught up before
+        returning), snapshot or miss. None if there was no get() since.
+        """
+        outcome = getattr(self._outcome, "value", None)
+        self._outcome.value = None
+        return outcome
+
+    def get(self, key, fetch, merge_on, sort_by=None, ascending=True, prepare=None):
+        """
+        Return the frame for key.
+
+        fetch(watermark) must return the full result when watermark is None,
+        and otherwise only the rows for merge keys staged after watermark,
+        each with a last_staged_at column. prepare(frame), if given, runs on
+        every fetched and merged frame (e.g. to set compact dtypes) and must
+        give the same result when run twice.
+
+        The returned frame is shared by every session and rerun, not copied:
+        treat it as read-only.
+        """
+        spec = (fetch, merge_on, sort_by, ascending, prepare)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                stale = time.time() - entry["loaded_at"] >= self.ttl
+                if not stale or entry["refreshing"]:
+                    return self._served("stale" if stale else "hit", entry["frame"])
+                entry["refreshing"] = True
+                foreground = entry.pop("foreground", False) or not self.background
+            else:
+                self.misses += 1
+
+        if entry is None:
+            snapshot = self.snapshots.load(key) if self.snapshots else None
+            if snapshot is not None:
+                return self._served("snapshot", self._restore(key, snapshot, spec))
+            frame = fetch(None)
+            if sort_by:
+                frame = frame.sort_values(sort_by, ascending=ascending, ignore_index=True)
+            frame, watermark = self._split(frame, prepare)
+            self._store(key, frame, watermark, spec)
+            return self._served("miss", frame)
+
+        entry["spec"] = spec
+        if foreground:
+            return self._served("refresh", self._refresh(key, entry, spec))
+        threading.Thread(target=self._refresh, args=(key, entry, spec), daemon=True).start()
+        return self._served("stale", entry["frame"])
+
+    def _restore(self, key, snapshot, spec):
+        """Serve a snapshot right away and catch it up from its watermark"""
+        frame, watermark = snapshot
+        prepare = spec[4]
+        frame = prepare(frame) if prepare else frame
+        entry = self._store(key, frame, watermark, spec, loaded_at=0, refreshing=True, save=False)
+        threading.Thread(target=self._refresh, args=(key, entry, spec), daemon=True).start()
+        return frame
+
+    def _store(self, key, frame, watermark, spec, loaded_at=None, refreshing=False, save=True):
+        entry = {
+            "frame": frame,
+            "watermark": watermark,
+            "spec": spec,
+            "loaded_at": time.time() if loaded_at is None else loaded_at,
+            "refreshing": refreshing,
+            "version": 0
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        if save and self.snapshots:
+            self.snapshots.save(key, frame, watermark)
+        return entry
+
+    def _refresh(self, key, entry, spec):
+        fetch, merge_on, sort_by, ascending, prepare = spec
+        frame, watermark = entry["frame"], entry["watermark"]
+        version = entry["version"]
+        try:
+            changes, changes_watermark = self._split(fetch(watermark), prepare)
+        except Exception as e:
+            print(f"Incremental refresh of {key} failed: {e}")
+            with self._lock:
+                entry["refreshing"] = False
+            return frame
+
+        if not changes.empty:
+            kept = frame[~frame[merge_on].isin(changes[merge_on])]
+            frame = pd.concat([kept, changes], ignore_index=True)
+            frame = frame.sort_values(sort_by or merge_on, ascending=ascending, ignore_index=True)
+            # Concatenating categoricals with different categories falls back to object
+            frame = prepare(frame) if prepare else frame
+            if changes_watermark is not None:
+                watermark = changes_watermark if watermark is None else max(watermark, changes_watermark)
+        with self._lock:
+            self.refreshes += 1
+            # The entry may have been evicted or invalidated meanwhile
+            if self._entries.get(key) is entry:
+                entry["frame"] = frame
+                entry["watermark"] = watermark
+                # Invalidated while fetching: the changes may predate the new data
+                entry["loaded_at"] = time.time() if entry["version"] == version else 0
+                entry["refreshing"] = False
+        if self.snapshots and not changes.empty:
+            self.snapshots.save(key, frame, watermark)
+        print(f"Refreshed {key[0]}: {len(changes)} changed rows")
+        return frame
+
+    def refresh_all(self):
+        """Mark every entry stale; the next read of each catches up before returning"""
+        with self._lock:
+            for entry in self._entries.values():
+                entry["loaded_at"] = 0
+                entry["foreground"] = True
+
+    def invalidate(self, predicate):
+        """
+        Mark the entries whose key matches predicate stale and start
+        catching them up in the background. Returns how many matched.
+        """
+        with self._lock:
+            matched = [(key, entry) for key, entry in self._entries.items() if predicate(key)]
+            to_refresh = []
+            for key, entry in matched:
+                entry["loaded_at"] = 0
+                entry["version"] += 1
+                if not entry["refreshing"]:
+                    entry["refreshing"] = True
+                    to_refresh.append((key, entry))
+        for key, entry in to_refresh:
+            threading.Thread(target=self._refresh, args=(key, entry, entry["spec"]), daemon=True).start()
+        return len(matched)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "hits": self.hits,
+                "misses": self.misses,
+                "refreshes": self.refreshes,
+                "entries": len(self._entries)
+            }
+        if self.snapshots:
+            stats.update(self.snapshots.stats())
+        return stats
@@ -0,0 +1,258 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import streamlit as st
+from sqlalchemy import text
+
+from incremental_cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, IncrementalCache
+from snapshot_store import get_snapshot_store
+
+# Data loading functions, kept out of app.py so they can be imported (and
+# benchmarked) without running the dashboard script.
+# Table and schema names come from config and are quoted as identifiers;
+# every filter value is passed as a bound parameter.
+CACHE_TTL = float(os.getenv('DASHBOARD_CACHE_TTL') or DEFAULT_TTL)
+
+# Query time and st.cache_data misses of the loads made in each thread, for
+# the dashboard's profiling mode (see take_load_stats)
+_load_stats = threading.local()
+
+@st.cache_resource
+def get_frame_cache():
+    """
+    Incremental cache for the mart frames, shared by all sessions. Frames
+    are snapshotted to local files, so a restart renders from the snapshots
+    and catches up in the background.
+    """
+    return IncrementalCache(
+        ttl=CACHE_TTL,
+        max_entries=int(os.getenv('DASHBOARD_CACHE_MAX_ENTRIES') or DEFAULT_MAX_ENTRIES),
+        snapshots=get_snapshot_store()
+    )
+
+def read_sql(query, _engine, params=None):
+    """pd.read_sql on a text query, adding the time it takes to this thread's load stats"""
+    start = time.perf_counter()
+    try:
+        return pd.read_sql(text(query), _engine, params=params)
+    finally:
+        _load_stats.query_seconds = getattr(_load_stats, 'query_seconds', 0.0) + time.perf_counter() - start
+
+def _cache_miss():
+    """Called from the body of an st.cache_data loader, which only runs on a miss"""
+    _load_stats.cache = 'miss'
+
+def take_load_stats():
+    """
+    Database time and cache outcome of the loads made in this thread since
+    the last call, then reset them. cache is None when no cache recorded an
+    outcome, which for an st.cache_data loader means it was a hit.
+    """
+    frame_cache = get_frame_cache().take_outcome()
+    stats = {
+        'query_seconds': getattr(_load_stats, 'query_seconds', 0.0),
+        'cache': getattr(_load_stats, 'cache', None) or frame_cache
+    }
+    _load_stats.query_seconds = 0.0
+    _load_stats.cache = None
+    return stats
+
+def qualified_table(_engine, schema, table_name):
+    """Quote schema.table for use in a query"""
+    preparer = _engine.dialect.identifier_preparer
+    return f"{preparer.quote_identifier(schema)}.{preparer.quote_identifier(table_name)}"
+
+def build_filters(time_column=None, start=None, end=None, city=None):
+    """WHERE clause and params for a half-open [start, end) window and an optional city"""
+    clauses, params = [], {}
+    if time_column and start is not None:
+        clauses.append(f"{time_column} >= :start")
+        params['start'] = start
+    if time_column and end is not None:
+        clauses.append(f"{time_column} < :end")
+        params['end'] = end
+    if city:
+        clauses.append("city = :city")
+        params['city'] = city
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return where, params
+
+MEASURE_COLUMNS = ('avg_temp', 'min_temp', 'max_temp', 'avg_wind', 'avg_wind_speed')
+COUNT_COLUMNS = ('observations', 'frequency')
+LABEL_COLUMNS = ('city', 'weather_description')
+
+def compact_frame(df):
+    """float32 measures, int32 counts and categorical labels; running it twice changes nothing"""
+    dtypes = {}
+    for column in df.columns:
+        if column in MEASURE_COLUMNS:
+            dtypes[column] = 'float32'
+        elif column in COUNT_COLUMNS:
+            dtypes[column] = 'int32'
+        elif column in LABEL_COLUMNS:
+            # Categories in row order, so charts keep the frame's sort order
+            dtypes[column] = pd.CategoricalDtype(pd.unique(df[column].dropna().to_numpy()))
+    return df.astype(dtypes) if dtypes else df
+
+def prepare_hourly(df):
+    """Compact hourly frame with the hour of day and date the charts use precomputed"""
+    df = compact_frame(df)
+    return df.assign(hour_of_day=df['hour'].dt.hour.astype('int8'), date=df['hour'].dt.normalize())
+
+def fetch_mart(_engine, table_name, schema, key_column, aggregates,
+               time_column=None, start=None, end=None, city=None, watermark=None):
+    """
+    Aggregate a mart by key_column under the current filters.
+    With a watermark only the keys that have rows staged after it are
+    returned, fully re-aggregated, so they can replace the cached rows.
+    """
+    table = qualified_table(_engine, schema, table_name)
+    where, params = build_filters(time_column, start, end, city)
+    if watermark is not None:
+        changed = f"""{key_column} IN (
+            SELECT {key_column} FROM {table}
+            {where} {'AND' if where else 'WHERE'} last_staged_at > :watermark
+        )"""
+        where = f"{where} AND {changed}" if where else f"WHERE {changed}"
+        params['watermark'] = watermark
+    query = f"""
+    SELECT {key_column}, {aggregates}, MAX(last_staged_at) AS last_staged_at
+    FROM {table}
+    {where}
+    GROUP BY {key_column}
+    ORDER BY {key_column}
+    """
+    return read_sql(query, _engine, params)
+
+# The city list and date bounds go through the frame cache too, so a cold
+# start can build the filters from snapshots. They have no watermark, so
+# each refresh re-reads them in full.
+def load_cities(_engine, table_name, schema):
+    """List the cities present in a mart"""
+    try:
+        def fetch(watermark):
+            query = f"SELECT DISTINCT city FROM {qualified_table(_engine, schema, table_name)} ORDER BY city"
+            return read_sql(query, _engine)
+        frame = get_frame_cache().get(('cities', table_name, schema, None), fetch, merge_on='city')
+        return frame['city'].dropna().tolist()
+    except Exception as e:
+        st.error(f"Error loading cities: {e}")
+        return []
+
+def load_date_bounds(_engine, table_name, schema):
+    """First and last date in the daily mart"""
+    try:
+        def fetch(watermark):
+            query = f"SELECT MIN(date) AS first_date, MAX(date) AS last_date FROM {qualified_table(_engine, schema, table_name)}"
+            return read_sql(query, _engine)
+        # A refresh that moves first_date adds a row; the bounds span all rows
+        frame = get_frame_cache().get(('bounds', table_name, schema, None), fetch, merge_on='first_date')
+        first, last = frame['first_date'].min(), frame['last_date'].max()
+        if pd.isna(first):
+            return None
+        return pd.to_datetime(first).date(), pd.to_datetime(last).date()
+    except Exception as e:
+        st.error(f"Error loading date range: {e}")
+        return None
+
+def load_weather_descriptions(_engine, table_name, schema, city=None):
+    """Load weather description counts, summed across cities unless one is selected"""
+    try:
+        def fetch(watermark):
+            return fetch_mart(_engine, table_name, schema, 'weather_description',
+                              "SUM(frequency)::BIGINT AS frequency", city=city, watermark=watermark)
+        return get_frame_cache().get(('descriptions', table_name, schema, city), fetch,
+                                     merge_on='weather_description', sort_by='frequency', ascending=False,
+                                     prepare=compact_frame)
+    except Exception as e:
+        st.error(f"Error loading weather descriptions: {e}")
+        return None
+
+def load_hourly_data(_engine, table_name, schema, start=None, end=None, city=None):
+    """Load hourly weather data for the window, averaged across cities unless one is selected"""
+    try:
+        def fetch(watermark):
+            df = fetch_mart(_engine, table_name, schema, 'hour',
+                            "AVG(avg_temp) AS avg_temp, AVG(avg_wind) AS avg_wind",
+                            'hour', start, end, city, watermark)
+            df['hour'] = pd.to_datetime(df['hour'])
+            return df
+        return get_frame_cache().get(('hourly', table_name, schema, start, end, city), fetch,
+                                     merge_on='hour', prepare=prepare_hourly)
+    except Exception as e:
+        st.error(f"Error loading hourly data: {e}")
+        return None
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_hourly_profile(_engine, table_name, schema, start=None, end=None, city=None):
+    """Average temperature and wind by hour of day over the window"""
+    _cache_miss()
+    try:
+        where, params = build_filters('hour', start, end, city)
+        query = f"""
+        SELECT
+            EXTRACT(HOUR FROM hour)::INTEGER AS hour_of_day,
+            AVG(avg_temp) AS avg_temp,
+            AVG(avg_wind) AS avg_wind
+        FROM {qualified_table(_engine, schema, table_name)}
+        {where}
+        GROUP BY 1
+        ORDER BY 1
+        """
+        return compact_frame(read_sql(query, _engine, params))
+    except Exception as e:
+        st.error(f"Error loading hourly profile: {e}")
+        return None
+
+SUMMARY_AGGREGATES = """
+    SUM(observations)::BIGINT AS observations,
+    AVG(avg_temp) AS avg_temp,
+    MIN(min_temp) AS min_temp,
+    MAX(max_temp) AS max_temp,
+    AVG(avg_wind_speed) AS avg_wind_speed
+"""
+
+def load_summary_data(_engine, dataset, table_name, schema, period, start=None, end=None, city=None):
+    """Load a daily, weekly or monthly summary for the window, combined across cities unless one is selected"""
+    def fetch(watermark):
+        df = fetch_mart(_engine, table_name, schema, period, SUMMARY_AGGREGATES,
+                        period, start, end, city, watermark)
+        df[period] = pd.to_datetime(df[period])
+        return df
+    return get_frame_cache().get((dataset, table_name, schema, start, end, city), fetch,
+                                 merge_on=period, prepare=compact_frame)
+
+def load_daily_data(_engine, table_name, schema, start=None, end=None, city=None):
+    """Load the daily weather summary for the window, combined across cities unless one is selected"""
+    try:
+        return load_summary_data(_engine, 'daily', table_name, schema, 'date', start, end, city)
+    except Exception as e:
+        st.error(f"Error loading daily data: {e}")
+        return None
+
+@st.cache_data(ttl=CACHE_TTL)
+def load_profile_rollup(_engine, table_name, schema, start=None, end=None, city=None):
+    """
+    Hour-of-day profile from the per-month profile rollup, weighted by
+    observations. It covers every month the window touches.
+    """
+    _cache_miss()
+    try:
+        month_start = start.replace(day=1) if start is not None else None
+        where, params = build_filters('month', month_start, end, city)
+        query = f"""
+        SELECT
+            hour_of_day,
+            SUM(avg_temp * observations) / NULLIF(SUM(observations), 0) AS avg_temp,
+            SUM(avg_wind * observations) / NULLIF(SUM(observations) FILTER (WHERE avg_wind IS NOT NULL), 0) AS avg_wind
+        FROM {qualified_table(_engine, schema, table_name)}
+        {where}
+        GROUP BY hour_of_day
+        ORDER BY hour_of_day
+        """
+        return compact_frame(read_sql(query, _engine, params))
+    except Exception as e:
+        st.error(f"Error loading hourly profile: {e}")
+        return None
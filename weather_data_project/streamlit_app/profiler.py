@@ -0,0 +1,114 @@
+import functools
+import json
+import os
+import threading
+import time
+
+DEFAULT_LOG_PATH = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "dashboard_profile.jsonl")
+
+SERVED_FROM_CACHE = ("hit", "stale", "snapshot")
+
+_log_lock = threading.Lock()
+
+class _Instrumented:
+    """Module proxy whose callables are timed by a profiler; other attributes pass through"""
+
+    def __init__(self, profiler, module, kind, names, label):
+        self._profiler = profiler
+        self._module = module
+        self._kind = kind
+        self._names = names
+        self._label = label
+        self._wrapped = {}
+
+    def __getattr__(self, name):
+        value = getattr(self._module, name)
+        if not callable(value) or (self._names is not None and name not in self._names):
+            return value
+        if name not in self._wrapped:
+            self._wrapped[name] = self._profiler.wrap(value, self._kind, f"{self._label}.{name}")
+        return self._wrapped[name]
+
+class RerunProfiler:
+    """
+    Timings for one dashboard rerun: every wrapped call is recorded with its
+    kind (query, transform, figure, render), duration and, for loaders, the
+    time spent in the database and whether the cache had the data.
+
+    A disabled profiler returns functions and modules unchanged, so the
+    dashboard pays nothing when profiling is off.
+
+    load_stats, if given, returns {'query_seconds', 'cache'} for the loads
+    made in the calling thread since it was last called.
+    """
+
+    def __init__(self, enabled=False, load_stats=None):
+        self.enabled = enabled
+        self.load_stats = load_stats
+        self.records = []
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def wrap(self, fn, kind, name=None):
+        """Time calls to fn under the given kind"""
+        if not self.enabled:
+            return fn
+        name = name or fn.__name__
+        # st.cache_data functions have clear(); without a recorded miss they were a hit
+        cached = hasattr(fn, "clear")
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if kind == "query" and self.load_stats:
+                self.load_stats()
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record = {"kind": kind, "name": name, "seconds": time.perf_counter() - start}
+                if kind == "query" and self.load_stats:
+                    stats = self.load_stats()
+                    record["query_seconds"] = stats["query_seconds"]
+                    record["cache"] = stats["cache"] or ("hit" if cached else None)
+                with self._lock:
+                    self.records.append(record)
+
+        if cached:
+            wrapper.clear = fn.clear
+        return wrapper
+
+    def instrument(self, module, kind, names=None, label=None):
+        """Proxy for module whose callables (or just the named ones) are timed as label.name"""
+        if not self.enabled:
+            return module
+        return _Instrumented(self, module, kind, names, label or module.__name__)
+
+    def summary(self):
+        """Total seconds and call count per kind, plus the whole rerun so far"""
+        with self._lock:
+            records = list(self.records)
+        totals = {}
+        for record in records:
+            total = totals.setdefault(record["kind"], {"calls": 0, "seconds": 0.0})
+            total["calls"] += 1
+            total["seconds"] += record["seconds"]
+        caches = [record["cache"] for record in records if record.get("cache")]
+        return {
+            "rerun_seconds": time.perf_counter() - self.started,
+            "kinds": totals,
+            # Served without waiting on the database, even if refreshed afterwards
+            "cache_hits": sum(1 for cache in caches if cache in SERVED_FROM_CACHE),
+            "cache_misses": sum(1 for cache in caches if cache not in SERVED_FROM_CACHE)
+        }
+
+    def export(self, path, **fields):
+        """Append this rerun's timings to a JSON lines log, for aggregating across sessions"""
+        with self._lock:
+            records = list(self.records)
+        line = json.dumps({"ts": time.time(), **fields, "summary": self.summary(), "records": records}, default=str)
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with _log_lock, open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            print(f"Failed to write dashboard profile {path}: {e}")
@@ -0,0 +1,116 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+DEFAULT_SNAPSHOT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "weather_data_pipeline", "snapshots")
+DEFAULT_MAX_FILES = 64
+FORMAT_VERSION = "1"
+
+class SnapshotStore:
+    """
+    Local Arrow IPC snapshots of cached frames, one file per cache key.
+
+    Each file holds the frame and, in its schema metadata, the key it was
+    saved for and the newest last_staged_at it covers. Files are memory
+    mapped on load, so a restarted server or a new replica can serve them
+    before the database has answered, then catch up from the watermark.
+    Files are replaced atomically; a server that still has the old file
+    mapped keeps reading it until it lets go. Beyond max_files the least
+    recently written snapshots are deleted.
+    """
+
+    def __init__(self, directory=DEFAULT_SNAPSHOT_DIR, max_files=DEFAULT_MAX_FILES):
+        self.directory = directory
+        self.max_files = max_files
+        self.loaded = 0
+        self.saved = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.directory, f"{digest}.arrow")
+
+    def load(self, key):
+        """Return (frame, watermark) saved for key, or None when there is no usable snapshot"""
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with pa.memory_map(path, "r") as source:
+                table = pa.ipc.open_file(source).read_all()
+            metadata = table.schema.metadata or {}
+            if metadata.get(b"format") != FORMAT_VERSION.encode() or metadata.get(b"key") != repr(key).encode("utf-8"):
+                return None
+            watermark = metadata.get(b"watermark")
+            frame = table.replace_schema_metadata(None).to_pandas(split_blocks=True)
+        except (OSError, ValueError, pa.ArrowException) as e:
+            print(f"Ignoring unreadable snapshot {path}: {e}")
+            return None
+        with self._lock:
+            self.loaded += 1
+        return frame, pd.Timestamp(watermark.decode()) if watermark else None
+
+    def save(self, key, frame, watermark):
+        """Atomically write the snapshot for key"""
+        path = self._path(key)
+        metadata = {"format": FORMAT_VERSION, "key": repr(key)}
+        if watermark is not None:
+            metadata["watermark"] = pd.Timestamp(watermark).isoformat()
+        try:
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **metadata})
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f, pa.ipc.new_file(f, table.schema) as writer:
+                    writer.write_table(table)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except (OSError, ValueError, pa.ArrowException) as e:
+            print(f"Failed to write snapshot {path}: {e}")
+            return
+        with self._lock:
+            self.saved += 1
+        self._prune()
+
+    def _prune(self):
+        try:
+            paths = [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith(".arrow")]
+            paths.sort(key=os.path.getmtime, reverse=True)
+            for path in paths[self.max_files:]:
+                os.unlink(path)
+        except OSError as e:
+            print(f"Failed to prune snapshots in {self.directory}: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {"loaded": self.loaded, "saved": self.saved}
+
+def get_snapshot_store():
+    """
+    Return a snapshot store configured from the environment, or None when
+    snapshots are disabled or pyarrow is missing:
+    - DASHBOARD_SNAPSHOTS (default true)
+    - DASHBOARD_SNAPSHOT_DIR
+    - DASHBOARD_SNAPSHOT_MAX_FILES
+    """
+    if os.getenv("DASHBOARD_SNAPSHOTS", "true").lower() in ("0", "false", "no"):
+        return None
+    if not PYARROW_AVAILABLE:
+        print("pyarrow is not installed; dashboard snapshots are disabled")
+        return None
+    return SnapshotStore(
+        directory=os.getenv("DASHBOARD_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR,
+        max_files=int(os.getenv("DASHBOARD_SNAPSHOT_MAX_FILES") or DEFAULT_MAX_FILES)
+    )